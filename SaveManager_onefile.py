@@ -1,3 +1,7 @@
+import time
+
+app_start_time = time.perf_counter()  # Taken before the other imports so they count
+
 import dearpygui.dearpygui as dpg
 import os
 import json
@@ -6,22 +10,39 @@ import sys
 import configparser
 import pyperclip
 import queue
-import time
 import ctypes
 import webbrowser
-import requests
-from PIL import ImageGrab
-import keyboard
 from datetime import datetime
 import ast
-import dxcam
-import cv2
 import logging
-import shutil
-import pywinstyles
 from win32 import win32gui
-import customtkinter as ct
-from tkinter import filedialog
+from savemanager.copy_engine import CopyEngine, clear_destination_folder
+from savemanager.scanner import scan_folder
+from savemanager.path_filter import PathFilter
+from savemanager.copy_log import CopyLog
+from savemanager.progress import ProgressCounters
+from savemanager.finder import FileCrawler
+from savemanager.finder_index import FinderIndex, FINDER_INDEX_FILE_NAME
+from savemanager.save_locations import (
+    SaveLocationResolver,
+    load_save_locations,
+    merge_save_locations,
+    SAVE_LOCATIONS_FILE_NAME,
+)
+from savemanager.settings import get_default_copy_settings
+from savemanager.lazy_import import lazy_import, save_import_timings
+from savemanager.tasks import TaskRuntime, PRIORITY_HIGH, PRIORITY_LOW
+from savemanager.downloads import ReleaseCache, RELEASE_CACHE_NAME
+
+# Heavy modules only needed by recording, screenshots, update checks, dialogs and
+# the window style set after the first frame; they are imported on first use
+ImageGrab = lazy_import("PIL.ImageGrab")
+keyboard = lazy_import("keyboard")
+dxcam = lazy_import("dxcam")
+cv2 = lazy_import("cv2")
+pywinstyles = lazy_import("pywinstyles")
+ct = lazy_import("customtkinter")
+filedialog = lazy_import("tkinter.filedialog")
 
 
 app_version: str = "2.6.0_Windows"
@@ -30,16 +51,21 @@ release_date: str = "2/20/2025"
 sources: list = []
 destinations: list = []
 names: list = []
+modes: list = []
+excludes: list = []  # gitignore style patterns per folder pair
+
+destination_modes: dict = {
+    "Copy files": "copy",
+    "Deduplicated store": "dedup",
+    "Snapshots": "snapshot",
+    "Compressed archive": "archive",
+}
 
 settings: dict = {
-    "copy_folder_checkbox_state": False,
-    "file_size_limit": 5,
     "show_image_status": False,
     "remember_window_pos": True,
-    "skip_existing_files": True,
-    "clear_destination_folder": False,
-    "skip_hidden_files": False,
     "file_extensions": [".sav", ".save"],
+    "search_folder_paths": True,
     "folder_paths": [
         "C:\\Program Files",
         "C:\\Program Files (x86)",
@@ -49,7 +75,7 @@ settings: dict = {
         os.path.join(os.path.expanduser("~"), "Documents"),
         "C:\\Users\\Public\\Documents",
     ],
-    "ignored_folders": [],
+    **get_default_copy_settings(),
 }
 
 recording_settings: dict = {
@@ -64,14 +90,17 @@ img_id = None
 is_recording_keybind = False
 target_app_frame_rate: int = -1
 
-start_time_global = 0
-total_bytes_global = 0
 last_update_time = 0
 
 
 config = configparser.ConfigParser()
-progress_queue = queue.Queue()
-cancel_flag = threading.Event()
+# Copy, search and update check jobs, each with its own cancel token
+task_runtime = TaskRuntime()
+copy_log = CopyLog()
+copy_progress = ProgressCounters()
+
+log_rows: int = 20  # text items in the copy log, only these are ever rendered
+log_rendered_state = None
 
 
 """def resource_path(relative_path):
@@ -108,6 +137,12 @@ if not os.path.exists(data_dir):
 
 json_file_path = os.path.join(data_dir, "save_folders.json")
 config_file = os.path.join(data_dir, "settings.ini")
+manifest_dir = os.path.join(data_dir, "manifests")
+finder_index_file = os.path.join(data_dir, FINDER_INDEX_FILE_NAME)
+# Entries in app_data's copy add to or override the bundled database
+save_locations_file = os.path.join(data_dir, SAVE_LOCATIONS_FILE_NAME)
+import_timings_file = os.path.join(data_dir, "import_timings.jsonl")
+release_cache_file = os.path.join(data_dir, RELEASE_CACHE_NAME)
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -115,6 +150,7 @@ logging.basicConfig(
 )
 
 font_path = resource_path("docs/font.otf")
+bundled_save_locations_file = resource_path(f"docs/{SAVE_LOCATIONS_FILE_NAME}")
 default_font_size = 24
 
 
@@ -195,12 +231,21 @@ def reset_settings():
                     logging.debug("Reset font_size from config file")
 
 
+def get_mode_label(mode):
+    for label, value in destination_modes.items():
+        if value == mode:
+            return label
+    return mode
+
+
 def load_entries():
-    global sources, destinations, names
+    global sources, destinations, names, modes, excludes
 
     sources.clear()
     destinations.clear()
     names.clear()
+    modes.clear()
+    excludes.clear()
 
     if os.path.exists(json_file_path):
         with open(json_file_path, "r") as f:
@@ -209,10 +254,14 @@ def load_entries():
                 entry_name = entry["name"]
                 entry_source = entry["source"]
                 entry_dest = entry["destination"]
+                entry_mode = entry.get("mode", "copy")
+                entry_exclude = entry.get("exclude", [])
 
                 names.append(entry_name)
                 sources.append(entry_source)
                 destinations.append(entry_dest)
+                modes.append(entry_mode)
+                excludes.append(entry_exclude)
 
                 item_id = dpg.add_collapsing_header(
                     label=f"Folder Pair: {entry_name}",
@@ -242,6 +291,19 @@ def load_entries():
                     parent=item_id,
                     user_data=entry_dest,
                 )
+                dpg.add_text(
+                    f" Mode: {get_mode_label(entry_mode)}",
+                    wrap=0,
+                    color=(255, 140, 0),
+                    parent=item_id,
+                )
+                if entry_exclude:
+                    dpg.add_text(
+                        f" Exclude: {', '.join(entry_exclude)}",
+                        wrap=0,
+                        color=(255, 140, 0),
+                        parent=item_id,
+                    )
 
                 with dpg.item_handler_registry(tag=f"text_handler_{source_item_id}"):
                     dpg.add_item_clicked_handler(
@@ -271,11 +333,21 @@ def load_entries():
 
 
 def save_entries():
-    global sources, destinations, names
+    global sources, destinations, names, modes, excludes
 
     entries = []
-    for name, source, destination in zip(names, sources, destinations):
-        entries.append({"name": name, "source": source, "destination": destination})
+    for name, source, destination, mode, exclude in zip(
+        names, sources, destinations, modes, excludes
+    ):
+        entries.append(
+            {
+                "name": name,
+                "source": source,
+                "destination": destination,
+                "mode": mode,
+                "exclude": exclude,
+            }
+        )
     with open(json_file_path, "w") as f:
         json.dump(entries, f, indent=4)
     dpg.set_value("status_text", "Folder pairs saved successfully.")
@@ -283,11 +355,13 @@ def save_entries():
 
 
 def clear_entries_callback(sender, app_data):
-    global sources, destinations, names
+    global sources, destinations, names, modes, excludes
 
     sources.clear()
     destinations.clear()
     names.clear()
+    modes.clear()
+    excludes.clear()
 
     dpg.delete_item("entry_list", children_only=True)
     dpg.set_value("status_text", "All folder pairs cleared.")
@@ -299,12 +373,14 @@ def clear_entries_callback(sender, app_data):
 
 
 def clear_latest_entry(sender, app_data):
-    global sources, destinations, names
+    global sources, destinations, names, modes, excludes
 
     try:
         sources.pop()
         destinations.pop()
         names.pop()
+        modes.pop()
+        excludes.pop()
     except IndexError:
         return
 
@@ -319,7 +395,7 @@ def clear_latest_entry(sender, app_data):
 
 
 def add_entry_callback(sender, app_data):
-    global sources, destinations, names
+    global sources, destinations, names, modes, excludes
 
     name = dpg.get_value("name_input")
     if name in names:
@@ -332,8 +408,16 @@ def add_entry_callback(sender, app_data):
     if name and sources and destinations:
         current_source = sources[-1]
         current_destination = destinations[-1]
+        current_mode = destination_modes[dpg.get_value("mode_input")]
+        current_exclude = [
+            line.strip()
+            for line in dpg.get_value("exclude_input").splitlines()
+            if line.strip()
+        ]
 
         names.append(name)
+        modes.append(current_mode)
+        excludes.append(current_exclude)
         item_id = dpg.add_collapsing_header(
             label=f"Folder Pair: {name}",
             parent="entry_list",
@@ -360,6 +444,19 @@ def add_entry_callback(sender, app_data):
             parent=item_id,
             user_data=current_destination,
         )
+        dpg.add_text(
+            f" Mode: {get_mode_label(current_mode)}",
+            wrap=0,
+            color=(255, 140, 0),
+            parent=item_id,
+        )
+        if current_exclude:
+            dpg.add_text(
+                f" Exclude: {', '.join(current_exclude)}",
+                wrap=0,
+                color=(255, 140, 0),
+                parent=item_id,
+            )
 
         with dpg.item_handler_registry(tag=f"text_handler_{source_item_id}"):
             dpg.add_item_clicked_handler(
@@ -377,6 +474,7 @@ def add_entry_callback(sender, app_data):
         dpg.set_value("source_display", "")
         dpg.set_value("destination_display", "")
         dpg.set_value("name_input", "")
+        dpg.set_value("exclude_input", "")
         dpg.set_value("status_text", f"Added folder pair: '{name}'")
         if dpg.does_item_exist("no_entries_text"):
             dpg.delete_item("no_entries_text")
@@ -558,11 +656,10 @@ def start_keybind_recording():
 
 
 def set_cancel_to_true():
-    global cancel_flag
-    cancel_flag.set()
+    task_runtime.cancel("copy")
     dpg.show_item("copy_button")
     dpg.hide_item("cancel_button")
-    logging.debug("Non-daemon threads signaled to exit")
+    logging.debug("Copy task signaled to exit")
 
 
 def set_log_filter(sender, app_data):
@@ -571,231 +668,158 @@ def set_log_filter(sender, app_data):
         show_flag = dpg.get_item_user_data(sender)[1]
 
         if show_flag == "shown":
-            log_items = dpg.get_item_children("copy_log", slot=1)
-            for item in log_items:
-                if dpg.get_item_user_data(item) == level:
-                    dpg.hide_item(item)
+            copy_log.set_level_hidden(level, True)
             dpg.configure_item(sender, user_data=[level, "hidden"])
             sender_label = dpg.get_item_configuration(sender)["label"]
             dpg.configure_item(sender, label=f"{sender_label} (hidden)")
 
         elif show_flag == "hidden":
-            log_items = dpg.get_item_children("copy_log", slot=1)
-            for item in log_items:
-                if dpg.get_item_user_data(item) == level:
-                    dpg.show_item(item)
+            copy_log.set_level_hidden(level, False)
             dpg.configure_item(sender, user_data=[level, "shown"])
             sender_label = dpg.get_item_configuration(sender)["label"]
             new_label = sender_label.replace(" (hidden)", "")
             dpg.configure_item(sender, label=f"{new_label}")
+        dpg.set_value("copy_log_scroll", 0)
     except Exception as e:
         logging.error(f"Exception occurred with log filter: {e}")
 
 
-def delete_folder_with_children():
-    global destinations
+log_colors: dict = {
+    "copy": (0, 140, 139),
+    "skip": (139, 140, 0),
+    "missing": (229, 57, 53),
+    "ignore": (139, 140, 0),
+    "delete": (139, 140, 0),
+    "error": (229, 57, 53),
+}
 
-    dpg.set_value("status_text", "Clearing destination folders...")
-    for destination_folder in destinations:
-        if not os.path.exists(destination_folder):
-            logging.error(
-                f"The folder '{destination_folder}' does not exist. (this error should not be possible if everything above works correctly)"
+
+def render_copy_log():
+    # Called once per frame; only the visible rows are updated
+    global log_rendered_state
+
+    copy_log.drain()
+    total = copy_log.visible_count()
+    max_offset = max(0, total - log_rows)
+    # The offset counts rows up from the newest record, so 0 follows the log
+    offset = dpg.get_value("copy_log_scroll")
+    if log_rendered_state is not None and offset > 0:
+        # Keep the same records in view while new ones arrive; counted with
+        # appended, as the total stays the same once old records are dropped
+        offset += max(0, copy_log.appended - log_rendered_state[3])
+    offset = min(offset, max_offset)
+
+    state = (copy_log.version, offset, total, copy_log.appended)
+    if state == log_rendered_state:
+        return
+    log_rendered_state = state
+    dpg.configure_item("copy_log_scroll", max_value=max_offset)
+    dpg.set_value("copy_log_scroll", offset)
+
+    end = total - offset
+    records = copy_log.visible_records(max(0, end - log_rows), end)
+    for row in range(log_rows):
+        if row < len(records):
+            dpg.set_value(f"copy_log_row_{row}", records[row].message)
+            dpg.configure_item(
+                f"copy_log_row_{row}", color=log_colors[records[row].level], show=True
             )
-            return
+        else:
+            dpg.hide_item(f"copy_log_row_{row}")
 
-        for item in os.listdir(destination_folder):
-            item_path = os.path.join(destination_folder, item)
-            try:
-                if os.path.isfile(item_path) or os.path.islink(item_path):
-                    # Delete files and symbolic links
-                    os.unlink(item_path)
-                    dpg.add_text(
-                        f"Deleted file: '{item_path}'",
-                        color=(139, 140, 0),
-                        wrap=0,
-                        parent="copy_log",
-                        user_data="delete",
-                    )
-                elif os.path.isdir(item_path):
-                    # Optionally, delete subfolders and their contents
-                    shutil.rmtree(item_path)
-                    dpg.add_text(
-                        f"Deleted folder and its contents: '{item_path}'",
-                        color=(139, 140, 0),
-                        wrap=0,
-                        parent="copy_log",
-                        user_data="delete",
-                    )
-            except Exception as e:
-                dpg.add_text(
-                    f"Failed to delete '{item_path}': {e}",
-                    color=(229, 57, 53),
-                    wrap=0,
-                    parent="copy_log",
-                    user_data="error",
-                )
-                logging.error(f"Deleting files failed: {e}")
 
+def update_copy_progress():
+    # Samples the shared progress counters once per frame
+    global last_update_time
 
-def get_folder_size(source):
-    global settings
+    stats = copy_progress.stats()
+    if stats.total_bytes > 0:
+        copied_gb = stats.copied_bytes / (1024**3)
+        total_gb = stats.total_bytes / (1024**3)
+        progress_value = min(stats.copied_bytes / stats.total_bytes, 1.0)
 
-    total_size = 0
-    for root, dirs, files in os.walk(source):
-        # Check if the current folder should be ignored
-        current_folder_abs = os.path.abspath(root)
-        if current_folder_abs in settings["ignored_folders"]:
-            dirs[:] = []
-            continue
-        # Prevent hidden folders
-        if settings["skip_hidden_files"] and os.path.basename(root).startswith("."):
-            dirs[:] = []
-            continue
+        dpg.configure_item(
+            "progress_bar",
+            overlay=f"{copied_gb:.2f} GB / {total_gb:.2f} GB ({int(progress_value*100)}%) | {stats.done_files}/{stats.total_files} files",
+        )
+        dpg.set_value("progress_bar", progress_value)
 
-        # Add the size of files in non-ignored folders
-        for file in files:
-            if settings["skip_hidden_files"] and file.startswith("."):
-                continue
-            file_path = os.path.join(root, file)
-            try:
-                total_size += os.path.getsize(file_path)
-            except FileNotFoundError:
-                logging.error("File deleted during folder size calculation")
-                continue
-    return total_size
+    current_time = time.time()
+    if current_time - last_update_time >= 0.5:
+        speed_mb = stats.bytes_per_second / (1024**2)
+        if stats.eta_seconds is None:
+            eta_text = "estimating..."
+        else:
+            remaining_seconds = int(stats.eta_seconds)
+            eta_mins = remaining_seconds // 60
+            eta_secs = remaining_seconds % 60
+            eta_text = f"{eta_mins} min {eta_secs} sec"
+        dpg.set_value(
+            "speed_text",
+            f"Speed: {speed_mb:.1f} MB/s, {stats.files_per_second:.0f} files/s | ETA: {eta_text}",
+        )
+        if stats.current_file:
+            dpg.set_value("status_text", f"Copying: {stats.current_file}")
+        last_update_time = current_time
 
 
-def copy_thread(valid_entries, total_bytes):
-    global cancel_flag, settings, sources, destinations, names
-    try:
-        progress_queue.put(("start", total_bytes))
-        copied_bytes = 0
-        for index in valid_entries:
-            if cancel_flag.is_set():
-                progress_queue.put(("cancel", "Copy cancelled by user!"))
-                return
-            source = sources[index]
-            dest = destinations[index]
-            name = names[index]
-
-            if settings["copy_folder_checkbox_state"]:
-                new_destination = os.path.join(dest, os.path.basename(source))
-                os.makedirs(new_destination, exist_ok=True)
-                dest = new_destination
-
-            # Get all files with sizes
-            file_list = []
-            ignored_folders = settings["ignored_folders"]
-            for root, dirs, files in os.walk(source):
-                rel_dir_path = os.path.relpath(root, source)
-                current_folder_abs = os.path.abspath(root)
-
-                # Skip ignored folders
-                if current_folder_abs in ignored_folders:
-                    rel_ignored_path = os.path.relpath(current_folder_abs, source)
-                    dpg.add_text(
-                        f"Ignored because of a setting: '{rel_ignored_path}'",
-                        color=(139, 140, 0),
-                        wrap=0,
-                        parent="copy_log",
-                        user_data="ignore",
-                    )
-                    # Skip this folder and its contents by clearing the dirs list
-                    dirs[:] = []
-                    continue
+def scroll_copy_log(sender, app_data):
+    if dpg.is_item_hovered("copy_log"):
+        offset = dpg.get_value("copy_log_scroll") + int(app_data) * 3
+        max_offset = dpg.get_item_configuration("copy_log_scroll")["max_value"]
+        dpg.set_value("copy_log_scroll", max(0, min(offset, max_offset)))
 
-                # Skip hidden folders
-                if settings["skip_hidden_files"] and os.path.basename(root).startswith(
-                    "."
-                ):
-                    dpg.add_text(
-                        f"Skipped (hidden folder): '{rel_dir_path}'",
-                        color=(139, 140, 0),
-                        wrap=0,
-                        parent="copy_log",
-                        user_data="skip",
-                    )
-                    dirs[:] = []  # Prevent traversal into hidden folders
-                    continue
 
-                # Ensure empty folders are copied
-                dest_dir_path = os.path.join(dest, rel_dir_path)
-                os.makedirs(dest_dir_path, exist_ok=True)
+def delete_folder_with_children():
+    global destinations, modes
 
-                # Collect files from non-ignored folders
-                for file in files:
-                    if settings["skip_hidden_files"] and file.startswith(
-                        "."
-                    ):  # Skip hidden files
-                        dpg.add_text(
-                            f"Skipped (hidden file): '{file}'",
-                            color=(139, 140, 0),
-                            wrap=0,
-                            parent="copy_log",
-                            user_data="skip",
-                        )
-                        continue
-                    path = os.path.join(root, file)
-                    file_list.append((path, os.path.getsize(path)))
-
-            # Copy files with progress
-            for src_path, size in file_list:
-                if cancel_flag.is_set():
-                    progress_queue.put(("cancel", "Copy cancelled by user!"))
-                    return
-                rel_path = os.path.relpath(src_path, source)
-                dest_path = os.path.join(dest, rel_path)
-                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-
-                if (
-                    os.path.exists(dest_path)
-                    and settings["skip_existing_files"] == True
-                ):
-                    dpg.add_text(
-                        f"Skipped (already exists): '{rel_path}'",
-                        color=(139, 140, 0),
-                        wrap=0,
-                        parent="copy_log",
-                        user_data="skip",
-                    )
-                    total_bytes -= size  # Adjust total size
-                    progress_queue.put(("adjust_total", total_bytes))
-                    continue  # Skip this file
-
-                with open(src_path, "rb") as f_src, open(dest_path, "wb") as f_dst:
-                    while chunk := f_src.read(1024 * 1024):  # 1MB chunks
-                        if cancel_flag.is_set():
-                            progress_queue.put(("cancel", "Copy cancelled by user!"))
-                            return
-                        f_dst.write(chunk)
-                        copied_bytes += len(chunk)
-                        progress_queue.put(("progress", copied_bytes))
+    dpg.set_value("status_text", "Clearing destination folders...")
+    for destination_folder, mode in zip(destinations, modes):
+        if mode == "snapshot":
+            # Old snapshots are removed by the retention policy instead
+            continue
+        if not os.path.exists(destination_folder):
+            logging.error(
+                f"The folder '{destination_folder}' does not exist. (this error should not be possible if everything above works correctly)"
+            )
+            return
+        clear_destination_folder(destination_folder, copy_log.add)
 
-                dpg.add_text(
-                    f"Copied: '{rel_path}'",
-                    wrap=0,
-                    color=(0, 140, 139),
-                    parent="copy_log",
-                    user_data="copy",
-                )
 
-        progress_queue.put(("complete", "Copying completed."))
+def copy_thread(task, valid_entries, folder_plans, total_bytes):
+    # Runs as the "copy" task; the result is handled in main() when it finishes
+    global settings, sources, destinations, names, modes
 
-    except Exception as e:
-        progress_queue.put(("error", f"Error: {str(e)}"))
-    finally:
-        cancel_flag.clear()
-        dpg.show_item("copy_button")
-        dpg.hide_item("cancel_button")
+    task.report("start", total_bytes)
+    folder_pairs = []
+    for index in valid_entries:
+        source = sources[index]
+        dest = destinations[index]
+
+        if settings["copy_folder_checkbox_state"]:
+            new_destination = os.path.join(dest, os.path.basename(source))
+            os.makedirs(new_destination, exist_ok=True)
+            dest = new_destination
+        folder_pairs.append((folder_plans[index], dest, modes[index]))
+
+    engine = CopyEngine(
+        settings,
+        copy_progress,
+        task.token,
+        log_callback=copy_log.add,
+        max_workers=settings["copy_threads"],
+        threads_per_volume=settings["copy_threads_per_volume"],
+        manifest_dir=manifest_dir,
+    )
+    return engine.run(folder_pairs, total_bytes)
 
 
 def copy_all_callback(sender, app_data):
-    global settings, cancel_flag, sources, destinations, names
+    global settings, sources, destinations, names, excludes
 
     dpg.hide_item("copy_button")
     dpg.show_item("cancel_button")
-    cancel_flag.clear()
-    dpg.delete_item("copy_log", children_only=True)
+    copy_log.clear()
     dpg.set_value("speed_text", "")
     dpg.show_item("speed_text")
 
@@ -803,9 +827,11 @@ def copy_all_callback(sender, app_data):
         dpg.set_value("status_text", "No entries to copy.")
         return
 
-    # Calculate total size and valid entries
+    # Scan folders once; the plans are reused by the copy thread
+    path_filter = PathFilter.from_settings(settings)
     total_bytes = 0
     valid_entries = []
+    folder_plans: dict = {}
     for index in range(len(sources)):
         source = sources[index]
         dest = destinations[index]
@@ -814,45 +840,38 @@ def copy_all_callback(sender, app_data):
 
         match (os.path.exists(source), os.path.exists(dest)):
             case (False, True):
-                dpg.add_text(
+                copy_log.add(
+                    "missing",
                     f"Folder pair '{name}' skipped as folder '{source}' does not exist.",
-                    color=(229, 57, 53),
-                    wrap=0,
-                    parent="copy_log",
-                    user_data="skip",
                 )
                 invalid_entry = True
             case (True, False):
-                dpg.add_text(
+                copy_log.add(
+                    "missing",
                     f"Folder pair '{name}' skipped as folder '{dest}' does not exist.",
-                    color=(229, 57, 53),
-                    wrap=0,
-                    parent="copy_log",
-                    user_data="skip",
                 )
                 invalid_entry = True
             case (False, False):
-                dpg.add_text(
+                copy_log.add(
+                    "missing",
                     f"Folder pair '{name}' skipped as folders '{source}' and '{dest}' do not exist.",
-                    color=(229, 57, 53),
-                    wrap=0,
-                    parent="copy_log",
-                    user_data="skip",
                 )
                 invalid_entry = True
 
         if not invalid_entry:
-            folder_size = get_folder_size(source)
-            if folder_size <= settings["file_size_limit"] * 1024**3:  # Check size limit
+            plan = scan_folder(
+                source,
+                settings,
+                path_filter=path_filter.with_exclude(excludes[index]),
+            )
+            if plan.total_size <= settings["file_size_limit"] * 1024**3:  # Check size limit
                 valid_entries.append(index)
-                total_bytes += folder_size
+                folder_plans[index] = plan
+                total_bytes += plan.total_size
             else:
-                dpg.add_text(
+                copy_log.add(
+                    "skip",
                     f"Skipped folder pair '{name}' as it exceeds size limit.",
-                    color=(139, 140, 0),
-                    wrap=0,
-                    parent="copy_log",
-                    user_data="skip",
                 )
 
     match invalid_entry:
@@ -874,7 +893,14 @@ def copy_all_callback(sender, app_data):
     dpg.set_value("status_text", "Copying directories...")
     dpg.show_item("progress_bar")
 
-    threading.Thread(target=copy_thread, args=(valid_entries, total_bytes)).start()
+    task_runtime.submit(
+        "copy",
+        copy_thread,
+        valid_entries,
+        folder_plans,
+        total_bytes,
+        priority=PRIORITY_HIGH,
+    )
 
 
 def open_source_file_dialog():
@@ -945,13 +971,35 @@ def recording_cancel_callback(sender, app_data):
     dpg.set_value("recording_status_text", "Operation was cancelled.")
 
 
-def search_files():
-    global settings, cancel_flag
+def add_found_directory(index, directory, confidence, game=None):
+    colors = [
+        (0, 140, 139),
+        (255, 140, 0),
+    ]
+    match_text = f"{confidence:.0%} match"
+    if game is not None:
+        match_text = f"{game}, {match_text}"
+    item_id = dpg.add_text(
+        f"{index}. {directory} ({match_text})",
+        wrap=0,
+        parent="directory_list",
+        color=colors[(index - 1) % len(colors)],
+        user_data=directory,
+    )
+
+    with dpg.item_handler_registry(tag=f"text_handler_{item_id}"):
+        dpg.add_item_clicked_handler(
+            user_data=dpg.get_item_user_data(item_id),
+            callback=text_click_handler,
+        )
+    dpg.bind_item_handler_registry(item_id, f"text_handler_{item_id}")
+
+
+def search_files(task):
+    # Runs as the "search" task; the search button is shown again when it finishes
+    global settings
 
     dpg.hide_item("file_search_button")
-    cancel_flag.clear()
-    sav_directories = set()
-    file_extensions_tuple = tuple(settings["file_extensions"])
 
     dpg.set_value("finder_progress_bar", 0.0)
     dpg.show_item("finder_progress_bar")
@@ -965,7 +1013,8 @@ def search_files():
     invalid_paths: list = []
     for folder in settings["folder_paths"]:
         if os.path.exists(folder):
-            directories_to_search.append(folder)
+            # Same form as the paths stored in the finder index
+            directories_to_search.append(os.path.normpath(folder))
         else:
             invalid_paths.append(folder)
             if len(invalid_paths) == 1:
@@ -980,110 +1029,119 @@ def search_files():
                     f"Skipped directories '{invalid_paths}' as they do not exist.",
                 )
 
-    total_dirs = sum(
-        len(dirs)
-        for dirpath in directories_to_search
-        for _, dirs, _ in os.walk(dirpath)
-    )
     dpg.set_value("finder_text", "Searching...")
+    file_extensions = settings["file_extensions"]
+    search_folder_paths = settings["search_folder_paths"]
 
-    processed_dirs: int = 0
-    total_files: int = 0
-
-    def process_directory(directory):
-        nonlocal processed_dirs, total_files
-        try:
-            for root, dirs, files in os.walk(directory):
-                if cancel_flag.is_set():
-                    return
-                processed_dirs += 1
-                dpg.set_value("finder_progress_bar", processed_dirs / total_dirs)
-
-                # Add files that match extensions
-                for file in files:
-                    if file.endswith(file_extensions_tuple):
-                        sav_directories.add(root)
-                        total_files += 1
-
-                # Update progress every 10 directories
-                if processed_dirs % 10 == 0:
-                    dpg.set_value("finder_progress_bar", processed_dirs / total_dirs)
+    if dpg.does_item_exist("directory_list"):
+        dpg.delete_item("directory_list", children_only=True)
 
-        except Exception as e:
-            dpg.show_item("search_status_text")
+    def show_results(results):
+        # results: folder -> (confidence, game name or None)
+        if dpg.does_item_exist("directory_list"):
+            dpg.delete_item("directory_list", children_only=True)
+        for index, directory in enumerate(sorted(results), start=1):
+            add_found_directory(index, directory, *results[directory])
+
+    def search():
+        # Known save locations first: a few stat calls instead of a crawl
+        save_locations = SaveLocationResolver(
+            load_save_locations(bundled_save_locations_file, save_locations_file)
+        ).resolve()
+        logging.debug(f"Save location database found {len(save_locations)} folders")
+
+        finder_index = FinderIndex(finder_index_file)
+        indexed_matches = None
+        if not search_folder_paths:
+            indexed_matches = {}
+        elif directories_to_search and finder_index.covers(directories_to_search):
+            indexed_matches = finder_index.query(directories_to_search, file_extensions)
+        shown_results = None
+        if save_locations or indexed_matches is not None:
+            # Show what is known right away, the crawl only checks for changes
+            shown_results = merge_save_locations(save_locations, indexed_matches or {})
+            show_results(shown_results)
+
+        found_directories = queue.Queue()
+        known_folders = finder_index.load_known(directories_to_search)
+        crawler = FileCrawler(
+            directories_to_search if search_folder_paths else [],
+            file_extensions,
+            # A warm index already listed every match; after the save location
+            # database, crawl matches are still streamed as they are found
+            on_match=(
+                None
+                if indexed_matches is not None
+                else lambda directory, confidence: found_directories.put(
+                    (directory, confidence)
+                )
+            ),
+            cancel_flag=task.token,
+            known=known_folders,
+            exclude={location.path for location in save_locations},
+        )
+        crawl_thread = threading.Thread(target=crawler.run, daemon=True)
+        crawl_thread.start()
+
+        # Matches are listed as they are found, sorted once the search is done
+        found_count = len(shown_results) if shown_results is not None else 0
+        while crawl_thread.is_alive() or not found_directories.empty():
+            crawl_thread.join(0.1)
+            while not found_directories.empty():
+                directory, confidence = found_directories.get()
+                if shown_results is not None and directory in shown_results:
+                    continue
+                found_count += 1
+                add_found_directory(found_count, directory, confidence)
+            dpg.set_value("finder_progress_bar", crawler.progress())
             dpg.set_value(
-                "search_status_text", f"Error processing directory {directory}: {e}"
+                "finder_text",
+                f"Searching... {crawler.scanned_folders()} folders scanned, {found_count} found",
             )
-            logging.error(f"Error when processing directory during file search: {e}")
-
-    # Using threading to prevent UI freezing
-    def thread_target():
-        global cancel_flag
 
-        for directory in directories_to_search:
-            if cancel_flag.is_set():
-                return
-            process_directory(directory)
+        if search_folder_paths:
+            finder_index.update(
+                crawler, known_folders, completed=not task.token.cancelled
+            )
+        finder_index.close()
+        if task.token.cancelled:
+            return
 
         dpg.set_value("finder_progress_bar", 1.0)
         dpg.hide_item("finder_progress_bar")
         dpg.hide_item("finder_text")
 
-        if dpg.does_item_exist("directory_list"):
-            dpg.delete_item("directory_list", children_only=True)
-
-        colors = [
-            (0, 140, 139),
-            (255, 140, 0),
-        ]
-        color_index = 0
-
-        if sav_directories:
+        results = merge_save_locations(save_locations, crawler.matches)
+        if results != shown_results:
             try:
-                for index, directory in enumerate(sorted(sav_directories), start=1):
-                    if cancel_flag.is_set():
-                        return
-                    cur_color = colors[color_index]
-                    item_id = dpg.add_text(
-                        f"{index}. {directory}",
-                        wrap=0,
-                        parent="directory_list",
-                        color=cur_color,
-                        user_data=directory,
-                    )
-
-                    with dpg.item_handler_registry(tag=f"text_handler_{item_id}"):
-                        dpg.add_item_clicked_handler(
-                            user_data=dpg.get_item_user_data(item_id),
-                            callback=text_click_handler,
-                        )
-                    dpg.bind_item_handler_registry(item_id, f"text_handler_{item_id}")
-
-                    color_index = (color_index + 1) % len(colors)
+                show_results(results)
             except Exception as e:
                 logging.error(
                     f"Error occurred while adding searched files as text items: {e}"
                 )
-        else:
+        if not results:
             dpg.add_text(
                 "No files found.",
                 wrap=0,
                 parent="directory_list",
             )
-        dpg.show_item("file_search_button")
+        logging.debug(
+            f"File search scanned {crawler.scanned_folders()} folders, {len(crawler.errors)} could not be read"
+        )
 
-    thread = threading.Thread(target=thread_target)
-    thread.start()
+    search()
 
 
 def start_search_thread():
-    logging.debug("Search thread started")
-    threading.Thread(target=search_files).start()
+    if task_runtime.running("search"):
+        return
+    logging.debug("Search task submitted")
+    task_runtime.submit("search", search_files)
 
 
 def check_for_updates(sender, app_data):
-    logging.debug("Update check thread started")
-    threading.Thread(target=check_for_updates_thread).start()
+    logging.debug("Update check task submitted")
+    task_runtime.submit("update_check", check_for_updates_thread, priority=PRIORITY_LOW)
 
 
 def compare_versions(current, latest):
@@ -1103,29 +1161,22 @@ def compare_versions(current, latest):
     return 0
 
 
-def check_for_updates_thread():
+def check_for_updates_thread(task):
     try:
-        repo_owner = "FlamingWater35"
-        repo_name = "SaveManager"
-        api_url = (
-            f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
-        )
-
-        response = requests.get(api_url)
-        response.raise_for_status()
-        release_data = response.json()
+        # Only downloaded again when GitHub reports a new ETag
+        release_data = ReleaseCache(release_cache_file).fetch()
 
         latest_version = release_data["tag_name"].lstrip("v")
         current_version = app_version.split("_")[0].lstrip("v")
 
         if compare_versions(current_version, latest_version) < 0:
-            progress_queue.put(("update", f"New version {latest_version} available!"))
+            task.report("update", f"New version {latest_version} available!")
             time.sleep(1)
-            progress_queue.put(("open_url", release_data["html_url"]))
+            task.report("open_url", release_data["html_url"])
         else:
-            progress_queue.put(("update", "You have the latest version"))
+            task.report("update", "You have the latest version")
     except Exception as e:
-        progress_queue.put(("update", f"Update check failed: {str(e)}"))
+        task.report("update", f"Update check failed: {str(e)}")
         logging.error(f"Update check failed: {e}")
 
 
@@ -1476,6 +1527,27 @@ def settings_change_callback(sender, app_data):
         save_settings("Settings", "clear_destination_folder", app_data)
     elif setting == "skip_hidden_files":
         save_settings("Settings", "skip_hidden_files", app_data)
+    elif setting == "incremental_copy":
+        save_settings("Settings", "incremental_copy", app_data)
+    elif setting == "incremental_hash":
+        save_settings("Settings", "incremental_hash", app_data)
+    elif setting in (
+        "snapshot_keep_last",
+        "snapshot_keep_hourly",
+        "snapshot_keep_daily",
+        "snapshot_keep_weekly",
+    ):
+        save_settings("Settings", setting, app_data)
+    elif setting == "delta_copy":
+        save_settings("Settings", "delta_copy", app_data)
+    elif setting == "delta_copy_threshold":
+        save_settings("Settings", "delta_copy_threshold", app_data)
+    elif setting == "copy_threads":
+        save_settings("Settings", "copy_threads", app_data)
+    elif setting == "copy_threads_per_volume":
+        save_settings("Settings", "copy_threads_per_volume", app_data)
+    elif setting == "search_folder_paths":
+        save_settings("Settings", "search_folder_paths", app_data)
     else:
         dpg.set_value(
             "status_text", "Changing setting failed; user_data incorrect or missing"
@@ -1622,6 +1694,135 @@ def setup_settings_window(font_size):
             user_data="skip_hidden_files",
         )
     dpg.add_spacer(height=20, parent="copy_manager_settings_child_window")
+    with dpg.group(horizontal=True, parent="copy_manager_settings_child_window"):
+        dpg.add_text(
+            "Incremental copy",
+            wrap=0,
+        )
+        with dpg.tooltip(dpg.last_item()):
+            dpg.add_text(
+                "Only copy files that are new or changed since the last copy (overrides 'Skip existing files')",
+                wrap=400,
+            )
+        dpg.add_checkbox(
+            default_value=settings["incremental_copy"],
+            callback=settings_change_callback,
+            user_data="incremental_copy",
+        )
+    dpg.add_spacer(height=20, parent="copy_manager_settings_child_window")
+    with dpg.group(horizontal=True, parent="copy_manager_settings_child_window"):
+        dpg.add_text(
+            "Compare file contents",
+            wrap=0,
+        )
+        with dpg.tooltip(dpg.last_item()):
+            dpg.add_text(
+                "With incremental copy, hash files whose date changed and skip them if the content is the same",
+                wrap=400,
+            )
+        dpg.add_checkbox(
+            default_value=settings["incremental_hash"],
+            callback=settings_change_callback,
+            user_data="incremental_hash",
+        )
+    dpg.add_spacer(height=20, parent="copy_manager_settings_child_window")
+    with dpg.group(horizontal=True, parent="copy_manager_settings_child_window"):
+        dpg.add_text(
+            "Delta copy for large files",
+            wrap=0,
+        )
+        with dpg.tooltip(dpg.last_item()):
+            dpg.add_text(
+                "When a large file already exists in the destination, only rewrite the parts that changed. Applies even when existing files are skipped",
+                wrap=400,
+            )
+        dpg.add_checkbox(
+            default_value=settings["delta_copy"],
+            callback=settings_change_callback,
+            user_data="delta_copy",
+        )
+    dpg.add_spacer(height=20, parent="copy_manager_settings_child_window")
+    with dpg.group(horizontal=True, parent="copy_manager_settings_child_window"):
+        dpg.add_text("Delta copy threshold", wrap=0)
+        with dpg.tooltip(dpg.last_item()):
+            dpg.add_text("Use delta copy for files at least this large", wrap=400)
+        dpg.add_input_int(
+            label="MB",
+            min_value=1,
+            max_value=100000,
+            default_value=settings["delta_copy_threshold"],
+            step=16,
+            step_fast=64,
+            width=200,
+            callback=settings_change_callback,
+            user_data="delta_copy_threshold",
+        )
+    dpg.add_spacer(height=20, parent="copy_manager_settings_child_window")
+    with dpg.group(horizontal=True, parent="copy_manager_settings_child_window"):
+        dpg.add_text("Copy threads", wrap=0)
+        with dpg.tooltip(dpg.last_item()):
+            dpg.add_text(
+                "How many files are copied at the same time (0 = automatic)", wrap=400
+            )
+        dpg.add_input_int(
+            min_value=0,
+            max_value=64,
+            default_value=settings["copy_threads"],
+            step=1,
+            step_fast=1,
+            width=200,
+            callback=settings_change_callback,
+            user_data="copy_threads",
+        )
+    dpg.add_spacer(height=20, parent="copy_manager_settings_child_window")
+    with dpg.group(horizontal=True, parent="copy_manager_settings_child_window"):
+        dpg.add_text("Threads per destination drive", wrap=0)
+        with dpg.tooltip(dpg.last_item()):
+            dpg.add_text(
+                "Limit for files written to the same drive at once (use 1 for HDDs and USB drives)",
+                wrap=400,
+            )
+        dpg.add_input_int(
+            min_value=1,
+            max_value=32,
+            default_value=settings["copy_threads_per_volume"],
+            step=1,
+            step_fast=1,
+            width=200,
+            callback=settings_change_callback,
+            user_data="copy_threads_per_volume",
+        )
+    dpg.add_spacer(height=20, parent="copy_manager_settings_child_window")
+    with dpg.tree_node(
+        label="Snapshot retention",
+        parent="copy_manager_settings_child_window",
+    ):
+        with dpg.tooltip(dpg.last_item()):
+            dpg.add_text(
+                "Which snapshots to keep for folder pairs in 'Snapshots' mode; older ones are deleted after each copy",
+                wrap=400,
+            )
+        dpg.add_spacer(height=5)
+        for label, key in (
+            ("Keep last", "snapshot_keep_last"),
+            ("Keep hourly", "snapshot_keep_hourly"),
+            ("Keep daily", "snapshot_keep_daily"),
+            ("Keep weekly", "snapshot_keep_weekly"),
+        ):
+            with dpg.group(horizontal=True):
+                dpg.add_text(label, wrap=0)
+                dpg.add_input_int(
+                    min_value=0,
+                    max_value=1000,
+                    default_value=settings[key],
+                    step=1,
+                    step_fast=1,
+                    width=200,
+                    callback=settings_change_callback,
+                    user_data=key,
+                )
+            dpg.add_spacer(height=5)
+    dpg.add_spacer(height=20, parent="copy_manager_settings_child_window")
     with dpg.tree_node(
         label="Manage ignored folders",
         parent="copy_manager_settings_child_window",
@@ -1683,6 +1884,22 @@ def setup_settings_window(font_size):
         )
         dpg.add_spacer(width=10)
         dpg.add_button(label="Manage folder paths", callback=open_folder_path_menu)
+    dpg.add_spacer(height=20, parent="save_finder_settings_child_window")
+    with dpg.group(horizontal=True, parent="save_finder_settings_child_window"):
+        dpg.add_text(
+            "Search folder paths",
+            wrap=0,
+        )
+        with dpg.tooltip(dpg.last_item()):
+            dpg.add_text(
+                "Known save locations of popular games are always checked; turn this off to skip searching the folder paths for other games",
+                wrap=400,
+            )
+        dpg.add_checkbox(
+            default_value=settings["search_folder_paths"],
+            callback=settings_change_callback,
+            user_data="search_folder_paths",
+        )
     dpg.add_spacer(height=10, parent="save_finder_settings_child_window")
 
     with dpg.file_dialog(
@@ -1761,6 +1978,9 @@ def show_windows():
     with dpg.item_handler_registry(tag="window_handler") as handler:
         dpg.add_item_resize_handler(callback=image_resize_callback)
 
+    with dpg.handler_registry():
+        dpg.add_mouse_wheel_handler(callback=scroll_copy_log)
+
     with dpg.theme() as child_window_theme:
         with dpg.theme_component(dpg.mvChildWindow):
             dpg.add_theme_style(dpg.mvStyleVar_WindowPadding, 15, 10)
@@ -1886,6 +2106,35 @@ def show_windows():
                                 dpg.add_text("", tag="destination_display", wrap=0)
                                 dpg.add_spacer(height=5)
 
+                                with dpg.group(horizontal=True):
+                                    dpg.add_text("Mode:")
+                                    dpg.add_combo(
+                                        items=list(destination_modes),
+                                        default_value="Copy files",
+                                        tag="mode_input",
+                                        width=400,
+                                    )
+                                    with dpg.tooltip(dpg.last_item()):
+                                        dpg.add_text(
+                                            "Deduplicated store keeps each file content once and links the destination files to it. Snapshots creates a dated folder per copy and links files that did not change. Compressed archive writes one dated .tar.xz file per copy, fastest for slow network and USB drives.",
+                                            wrap=400,
+                                        )
+                                dpg.add_spacer(height=5)
+
+                                dpg.add_text("Exclude patterns (one per line):")
+                                with dpg.tooltip(dpg.last_item()):
+                                    dpg.add_text(
+                                        "Files and folders to leave out, written like a .gitignore file: '*.log' matches at any depth, '/Backups' only in the source folder, 'cache/' only folders, and '!' in front includes a file again.",
+                                        wrap=400,
+                                    )
+                                dpg.add_input_text(
+                                    tag="exclude_input",
+                                    multiline=True,
+                                    width=400,
+                                    height=80,
+                                )
+                                dpg.add_spacer(height=10)
+
                                 dpg.add_button(
                                     label="Add folder pair", callback=add_entry_callback
                                 )
@@ -1985,8 +2234,26 @@ def show_windows():
                                         user_data=["delete", "shown"],
                                     )
                                 dpg.add_spacer(height=5)
-                            with dpg.child_window(tag="copy_log", auto_resize_y=True):
-                                pass
+                            with dpg.group(horizontal=True):
+                                with dpg.child_window(
+                                    tag="copy_log",
+                                    width=-40,
+                                    auto_resize_y=True,
+                                    horizontal_scrollbar=True,
+                                ):
+                                    for row in range(log_rows):
+                                        dpg.add_text(
+                                            "", tag=f"copy_log_row_{row}", show=False
+                                        )
+                                dpg.add_slider_int(
+                                    tag="copy_log_scroll",
+                                    vertical=True,
+                                    width=30,
+                                    height=log_rows * 30,
+                                    min_value=0,
+                                    max_value=0,
+                                    format="",
+                                )
                         dpg.add_spacer(height=10)
 
                         if settings["show_image_status"] == True:
@@ -2273,7 +2540,7 @@ def setup_viewport():
 
 
 def main():
-    global settings, target_app_frame_rate
+    global settings, target_app_frame_rate, last_update_time
 
     run_application()
 
@@ -2288,79 +2555,54 @@ def main():
     dpg.setup_dearpygui()
     dpg.show_viewport()
 
-    hwnd = win32gui.FindWindow(None, "Save Manager")
-    if hwnd == 0:
-        logging.error("Window not found for pywinstyles")
-    else:
-        pywinstyles.apply_style(hwnd, "mica")
-
+    task_runtime.start()
+    startup_seconds = None
+    copy_running = False
     while dpg.is_dearpygui_running():
         start_time = time.time()
 
-        while not progress_queue.empty():
-            item_type, data = progress_queue.get()
+        for task, item_type, data in task_runtime.poll():
             if item_type == "start":
-                total_bytes_global = data
-                start_time_global = time.time()
-                last_update_time = start_time_global
-            elif item_type == "progress":
-                copied_bytes = data
-                if total_bytes_global > 0:
-                    copied_gb = copied_bytes / (1024**3)
-                    total_gb = total_bytes_global / (1024**3)
-                    progress_value = copied_bytes / total_bytes_global
-
-                    dpg.configure_item(
-                        "progress_bar",
-                        overlay=f"{copied_gb:.2f} GB / {total_gb:.2f} GB ({int(progress_value*100)}%)",
-                    )
-                    dpg.set_value("progress_bar", progress_value)
-
-                    current_time = time.time()
-                    if current_time - last_update_time >= 0.5:
-                        elapsed = current_time - start_time_global
-                        if elapsed > 0:
-                            speed = copied_bytes / elapsed
-                            speed_mb = speed / (1024**2)
-                            remaining = (total_bytes_global - copied_bytes) / max(
-                                speed, 1
-                            )
-
-                            remaining_seconds = int(remaining)
-                            eta_mins = remaining_seconds // 60
-                            eta_secs = remaining_seconds % 60
-                            dpg.set_value(
-                                "speed_text",
-                                f"Speed: {speed_mb:.1f} MB/s | ETA: {eta_mins} min {eta_secs} sec",
-                            )
-                        last_update_time = current_time
-            elif item_type == "adjust_total":
-                total_bytes_global = data
-            elif item_type == "complete":
-                dpg.set_value("status_text", data)
-                dpg.hide_item("progress_bar")
-                dpg.hide_item("speed_text")
-            elif item_type == "cancel":
-                dpg.set_value("status_text", data)
-                dpg.hide_item("progress_bar")
-                dpg.hide_item("speed_text")
-            elif item_type == "error":
-                dpg.add_text(
-                    data,
-                    color=(229, 57, 53),
-                    wrap=0,
-                    parent="copy_log",
-                    user_data="error",
-                )
-                logging.error(f"Error during copy thread: {data}")
-                dpg.hide_item("progress_bar")
-                dpg.hide_item("speed_text")
+                last_update_time = time.time()
+                copy_running = True
             elif item_type == "update":
                 dpg.set_value("status_text", data)
             elif item_type == "open_url":
                 webbrowser.open(data)
-
+            elif item_type == "finished" and task.name == "copy":
+                copy_running = False
+                if task.state == "failed":
+                    copy_log.add("error", f"Error: {str(task.error)}")
+                    logging.error(f"Error during copy task: {task.error}")
+                elif task.result:
+                    dpg.set_value("status_text", "Copying completed.")
+                else:
+                    dpg.set_value("status_text", "Copy cancelled by user!")
+                dpg.hide_item("progress_bar")
+                dpg.hide_item("speed_text")
+                dpg.show_item("copy_button")
+                dpg.hide_item("cancel_button")
+            elif item_type == "finished" and task.name == "search":
+                if task.state == "failed":
+                    dpg.hide_item("finder_progress_bar")
+                    dpg.set_value("finder_text", f"Search failed: {task.error}")
+                dpg.show_item("file_search_button")
+
+        if copy_running:
+            update_copy_progress()
+        render_copy_log()
         dpg.render_dearpygui_frame()
+        if startup_seconds is None:
+            startup_seconds = time.perf_counter() - app_start_time
+            logging.debug(f"First frame rendered after {startup_seconds:.3f} s")
+
+            # Applied after the first frame so importing pywinstyles isn't part
+            # of the startup time
+            hwnd = win32gui.FindWindow(None, "Save Manager")
+            if hwnd == 0:
+                logging.error("Window not found for pywinstyles")
+            else:
+                pywinstyles.apply_style(hwnd, "mica")
 
         if target_app_frame_rate != -1:
             frame_delay = 1.0 / target_app_frame_rate
@@ -2370,10 +2612,10 @@ def main():
                 time.sleep(frame_delay - frame_time)
 
     def cleanup():
-        global cancel_flag, settings
+        global settings
 
         logging.info("Application exited")
-        cancel_flag.set()
+        task_runtime.shutdown(timeout=2)
         for thread in threading.enumerate():
             if thread is not threading.main_thread() and not thread.daemon:
                 thread.join(timeout=2)
@@ -2382,6 +2624,12 @@ def main():
             save_window_positions()
 
     dpg.set_exit_callback(cleanup)
+    # Includes modules imported on first use during the session
+    save_import_timings(
+        import_timings_file,
+        app_version=app_version,
+        startup_seconds=startup_seconds and round(startup_seconds, 4),
+    )
     dpg.destroy_context()
 
 
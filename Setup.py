@@ -5,13 +5,17 @@ import logging
 from CTkToolTip import CTkToolTip
 from CTkMessagebox import CTkMessagebox
 import requests
-import io
 import sys
 from win32com.client import Dispatch
 import py7zr
+from py7zr.callbacks import ExtractCallback
 import pythoncom
 import shutil
+import tempfile
+import threading
 import concurrent.futures
+from savemanager.delta_update import DeltaUpdate, MANIFEST_NAME, hash_file, save_install_record
+from savemanager.downloads import SegmentedDownload, ReleaseCache, create_session, LATEST_RELEASE_URL, RELEASE_CACHE_NAME, REQUEST_TIMEOUT
 
 
 logging.basicConfig(
@@ -19,6 +23,12 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s",
 )
 
+DOWNLOAD_WEIGHT = 0.7  # share of the progress bar for the download, the rest is extraction
+# Can point to a local server serving a release JSON and its assets for testing
+RELEASE_API_URL = os.getenv("SAVEMANAGER_RELEASE_API", LATEST_RELEASE_URL)
+# Unfinished downloads stay here and are continued by the next install attempt
+DOWNLOAD_DIR = os.path.join(tempfile.gettempdir(), "SaveManager_setup")
+
 def resource_path(relative_path):
     # Get the directory of the executable (or script in development)
     if "__compiled__" in globals():  # Check if running as a Nuitka bundle
@@ -34,10 +44,64 @@ def resource_path(relative_path):
 
     return full_path
 
+class InstallProgress:
+    # The one counter the install workers and the progress bar share: workers
+    # add the bytes they finished, the UI reads value() when it redraws
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phase_start = 0.0
+        self.phase_weight = 0.0
+        self.phase_total = 0
+        self.phase_done = 0
+
+    def start_phase(self, start, weight, total):
+        with self.lock:
+            self.phase_start = start
+            self.phase_weight = weight
+            self.phase_total = total
+            self.phase_done = 0
+
+    def add(self, count):
+        with self.lock:
+            self.phase_done += count
+
+    def value(self):
+        with self.lock:
+            if self.phase_total <= 0:
+                return self.phase_start
+            return self.phase_start + self.phase_weight * min(1.0, self.phase_done / self.phase_total)
+
+
+class ExtractProgress(ExtractCallback):
+    def __init__(self, progress):
+        self.progress = progress
+
+    def report_start_preparation(self):
+        pass
+
+    def report_start(self, processing_file_path, processing_bytes):
+        pass
+
+    def report_update(self, decompressed_bytes):
+        pass
+
+    def report_end(self, processing_file_path, wrote_bytes):
+        self.progress.add(int(wrote_bytes))
+
+    def report_warning(self, message):
+        logging.warning(f"Extraction warning: {message}")
+
+    def report_postprocess(self):
+        pass
+
+
 class App(ct.CTk):
     def __init__(self):
         super().__init__()
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        # The install itself and the removal of an old installation next to the download
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        # One connection pool for the release information, the manifest and the download
+        self.session = create_session()
 
         self.title("SaveManager Setup")
         window_width = 1000
@@ -53,7 +117,8 @@ class App(ct.CTk):
         self.protocol("WM_DELETE_WINDOW", self.show_close_popup)
   
         self.install_is_completed: bool = False
-        self.install_progress_bar_value = 0
+        self.install_progress = InstallProgress()
+        self.shown_install_progress = None
         self.pages: list = []
         self.page_progress: float = 0
         self.current_page: int = 0
@@ -251,8 +316,12 @@ class App(ct.CTk):
     
     def update_ui(self):
         if not self.install_is_completed:
-            self.install_progressbar.set(self.install_progress_bar_value)
-            self.after(5, self.update_ui)
+            # The workers never touch the bar; it is redrawn only when the counter moved
+            value = self.install_progress.value()
+            if value != self.shown_install_progress:
+                self.install_progressbar.set(value)
+                self.shown_install_progress = value
+            self.after(50, self.update_ui)
         else:
             self.install_progressbar.set(1.0)
             self.next_button.configure(text="Finish", state="normal")
@@ -263,61 +332,115 @@ class App(ct.CTk):
         self.install_log.see("end")
         self.install_log.configure(state="disabled")
 
+    def remove_existing_installation(self):
+        for item in os.listdir(self.installation_path):
+            item_path = os.path.join(self.installation_path, item)
+            
+            if item == "app_data":
+                continue
+            
+            if os.path.isdir(item_path):
+                shutil.rmtree(item_path)
+            elif os.path.isfile(item_path):
+                os.remove(item_path)
+
+    def download_archive(self, asset):
+        os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+        download = SegmentedDownload(asset["browser_download_url"], os.path.join(DOWNLOAD_DIR, asset["name"]), asset.get("size", 0), session=self.session, on_progress=self.install_progress.add)
+        self.install_progress.start_phase(0.0, DOWNLOAD_WEIGHT, asset.get("size", 0))
+        download.run()
+
+        # GitHub lists a "sha256:..." digest for release assets
+        digest = asset.get("digest") or ""
+        if digest.startswith("sha256:"):
+            if hash_file(download.path) != digest.split(":", 1)[1].lower():
+                download.discard()
+                raise ValueError("Downloaded archive is damaged (checksum mismatch), please try again")
+            self.log_text("Checksum verified")
+        else:
+            logging.warning("Release asset has no sha256 digest, checksum not verified")
+        return download
+
+    def extract_archive(self, archive_file):
+        with py7zr.SevenZipFile(archive_file, mode='r') as archive:
+            self.install_progress.start_phase(DOWNLOAD_WEIGHT, 1.0 - DOWNLOAD_WEIGHT, archive.archiveinfo().uncompressed)
+            archive.extractall(path=self.installation_path, callback=ExtractProgress(self.install_progress))
+
+    def full_install(self, archive_asset, existing_install):
+        removal = None
+        if existing_install:
+            self.log_text("Existing installation detected, removing it while downloading...")
+            removal = self.executor.submit(self.remove_existing_installation)
+
+        self.log_text(f"Downloading files from {archive_asset['browser_download_url']}...")
+
+        # The 7z index is stored at the end of the archive, so extraction
+        # starts once the download is complete
+        download = self.download_archive(archive_asset)
+        if removal is not None:
+            removal.result()
+
+        self.log_text("Extracting files...")
+        with open(download.path, "rb") as archive_file:
+            self.extract_archive(archive_file)
+        download.discard()
+
+    def delta_update(self, archive_asset, manifest):
+        # True if the installation was updated in place, False to fall back to a full install
+        try:
+            self.log_text("Existing installation detected, checking which files changed...")
+            update = DeltaUpdate(manifest, archive_asset["browser_download_url"], self.installation_path, session=self.session, on_progress=self.install_progress.add)
+            download_size = update.plan()
+            if not update.changed and not update.removed:
+                self.log_text("All files are up to date")
+            elif not update.worthwhile():
+                self.log_text("Most files changed, downloading the full release instead")
+                return False
+            else:
+                self.log_text(f"Updating {len(update.changed)} changed files ({download_size / 1024**2:.1f} MB to download)...")
+            self.install_progress.start_phase(0.0, 1.0, download_size)
+            update.apply()
+            return True
+        except Exception as e:
+            # apply() restores the old files on any error, so a full install can follow
+            logging.warning(f"Delta update failed: {e}")
+            self.log_text("Updating changed files failed, downloading the full release instead")
+            return False
+
     def install_process(self):
         try:
-            file_path = os.path.join(self.installation_path, "SaveManager.exe")
-            if os.path.isfile(file_path):
-                self.log_text("Existing installation detected, proceeding to remove it...")
-                for item in os.listdir(self.installation_path):
-                    item_path = os.path.join(self.installation_path, item)
-                    
-                    if item == "app_data":
-                        continue
-                    
-                    if os.path.isdir(item_path):
-                        shutil.rmtree(item_path)
-                    elif os.path.isfile(item_path):
-                        os.remove(item_path)
-
-            repo_api_url = "https://api.github.com/repos/FlamingWater35/SaveManager/releases/latest"
-            
+            existing_install = os.path.isfile(os.path.join(self.installation_path, "SaveManager.exe"))
+
             self.log_text("Fetching latest release information...")
-            response = requests.get(repo_api_url)
-            response.raise_for_status()
-            release_data = response.json()
+            release_cache = ReleaseCache(os.path.join(self.installation_path, "app_data", RELEASE_CACHE_NAME), RELEASE_API_URL, self.session)
+            release_data = release_cache.fetch()
             
-            asset_url = None
+            archive_asset = None
+            manifest_asset = None
             for asset in release_data.get("assets", []):
-                if asset["name"].endswith(".7z"):
-                    asset_url = asset["browser_download_url"]
-                    break
+                if asset["name"].endswith(".7z") and archive_asset is None:
+                    archive_asset = asset
+                elif asset["name"] == MANIFEST_NAME:
+                    manifest_asset = asset
 
-            if not asset_url:
+            if not archive_asset:
                 self.show_error_popup("No .7z file found in latest release.")
                 return
-            
-            self.log_text(f"Downloading files from {asset_url}...")
-
-            # Download 7z archive
-            response = requests.get(asset_url, stream=True)
-            response.raise_for_status()
-
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
-            archive_buffer = io.BytesIO()
-
-            for chunk in response.iter_content(chunk_size=8192):
-                archive_buffer.write(chunk)
-                downloaded += len(chunk)
-                if total_size > 0:
-                    self.install_progress_bar_value = downloaded / total_size
-
-            self.log_text("Extracting files...")
-            archive_buffer.seek(0)
 
-            # Extract 7z archive
-            with py7zr.SevenZipFile(archive_buffer, mode='r') as archive:
-                archive.extractall(path=self.installation_path)
+            # Releases with a file manifest can be updated by downloading only changed files
+            manifest = None
+            if manifest_asset is not None:
+                try:
+                    response = self.session.get(manifest_asset["browser_download_url"], timeout=REQUEST_TIMEOUT)
+                    response.raise_for_status()
+                    manifest = response.json()
+                except (requests.RequestException, ValueError) as e:
+                    logging.warning(f"Could not load release manifest: {e}")
+
+            if not (existing_install and manifest is not None and self.delta_update(archive_asset, manifest)):
+                self.full_install(archive_asset, existing_install)
+                if manifest is not None:
+                    save_install_record(self.installation_path, manifest)
             
             # Create desktop shortcut
             if self.desktop_shortcut.get():
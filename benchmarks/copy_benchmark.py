@@ -0,0 +1,311 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import builtins
+import collections
+import platform
+import tempfile
+import threading
+
+# Run from the repository root: python -m benchmarks.copy_benchmark
+from savemanager.settings import get_default_copy_settings
+from savemanager.scanner import scan_folder
+from savemanager.copy_engine import CopyEngine
+from savemanager.progress import ProgressCounters
+from benchmarks.trees import TREES, generate_tree
+
+
+DEFAULT_TOLERANCE = 0.10  # slower than the baseline by more than this is a regression
+# File system calls counted by FileCallCounter, by category
+FILE_CALLS = {
+    "stat": ("stat", "lstat", "fstat"),
+    "open": ("open",),
+    "listdir": ("listdir",),
+    "mkdir": ("mkdir",),
+    "utime": ("utime", "chmod"),
+    "rename": ("replace", "rename"),
+    "remove": ("remove", "unlink", "rmdir"),
+}
+
+
+def read_io_counters():
+    # Linux only: read/write syscalls of this process, all threads included.
+    # copy_file_range and sendfile count as one read and one write. stat,
+    # open and the other metadata calls are not included, FileCallCounter
+    # counts those.
+    try:
+        with open("/proc/self/io", "r") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return int(counters["syscr"]) + int(counters["syscw"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class FileCallCounter:
+    # Counts the file system calls made through Python while active by
+    # wrapping the os functions and open(); scandir counts one call per
+    # folder and one stat per DirEntry.stat(). The wrappers cost time, so
+    # counting is a separate run and never part of a timed one.
+    def __init__(self):
+        self.counts: collections.Counter = collections.Counter()
+        self.lock = threading.Lock()
+        self.originals: list = []
+
+    def count(self, category):
+        with self.lock:
+            self.counts[category] += 1
+
+    def wrap(self, category, function):
+        def counted(*args, **kwargs):
+            self.count(category)
+            return function(*args, **kwargs)
+
+        return counted
+
+    def patch(self, module, name, replacement):
+        self.originals.append((module, name, getattr(module, name)))
+        setattr(module, name, replacement)
+
+    def __enter__(self):
+        for category, names in FILE_CALLS.items():
+            for name in names:
+                self.patch(os, name, self.wrap(category, getattr(os, name)))
+        self.patch(builtins, "open", self.wrap("open", builtins.open))
+        scandir = os.scandir
+        self.patch(
+            os,
+            "scandir",
+            lambda *args: CountingScandir(scandir(*args), self),
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        while self.originals:
+            module, name, original = self.originals.pop()
+            setattr(module, name, original)
+
+    def per_file(self, files):
+        if not files:
+            return None
+        result = {
+            category: round(count / files, 2)
+            for category, count in sorted(self.counts.items())
+        }
+        result["total"] = round(sum(self.counts.values()) / files, 2)
+        return result
+
+
+class CountingScandir:
+    def __init__(self, iterator, counter):
+        counter.count("scandir")
+        self.iterator = iterator
+        self.counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.iterator.close()
+
+    def __iter__(self):
+        for entry in self.iterator:
+            yield CountingDirEntry(entry, self.counter)
+
+    def close(self):
+        self.iterator.close()
+
+
+class CountingDirEntry:
+    def __init__(self, entry, counter):
+        self.entry = entry
+        self.counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self.entry, name)
+
+    def __fspath__(self):
+        return self.entry.path
+
+    def stat(self, **kwargs):
+        self.counter.count("stat")
+        return self.entry.stat(**kwargs)
+
+
+def measure(function):
+    syscalls = read_io_counters()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    if syscalls is not None:
+        syscalls = read_io_counters() - syscalls
+    return result, seconds, syscalls
+
+
+def phase_result(seconds, files, size, syscalls):
+    return {
+        "seconds": round(seconds, 6),
+        "files": files,
+        "bytes": size,
+        "mb_per_second": round(size / 1024**2 / seconds, 2) if seconds else None,
+        "files_per_second": round(files / seconds, 1) if seconds else None,
+        "read_write_syscalls_per_file": (
+            round(syscalls / files, 2) if syscalls is not None and files else None
+        ),
+    }
+
+
+def empty_dest(tree, work_dir):
+    dest = os.path.join(work_dir, f"{tree.name}_dest")
+    if os.path.exists(dest):
+        shutil.rmtree(dest)
+    os.makedirs(dest)
+    return dest
+
+
+def create_engine(settings):
+    return CopyEngine(
+        settings,
+        ProgressCounters(),
+        threading.Event(),
+        max_workers=settings["copy_threads"],
+        threads_per_volume=settings["copy_threads_per_volume"],
+    )
+
+
+def run_tree(tree, work_dir, mode, repeat):
+    settings = get_default_copy_settings()
+    settings.update(tree.settings)
+    best: dict = {}
+    for _ in range(repeat):
+        dest = empty_dest(tree, work_dir)
+
+        # The scan also computes the size, there is no separate size walk
+        plan, seconds, syscalls = measure(lambda: scan_folder(tree.path, settings))
+        if len(plan.files) != tree.files or plan.total_size != tree.bytes:
+            raise RuntimeError(
+                f"Scan of '{tree.name}' found {len(plan.files)} files / {plan.total_size} bytes, expected {tree.files} / {tree.bytes}"
+            )
+        scan = phase_result(seconds, len(plan.files), plan.total_size, syscalls)
+
+        engine = create_engine(settings)
+        _, seconds, syscalls = measure(
+            lambda: engine.run([(plan, dest, mode)], plan.total_size)
+        )
+        copy = phase_result(seconds, len(plan.files), plan.total_size, syscalls)
+
+        for phase, result in (("scan", scan), ("copy", copy)):
+            if phase not in best or result["seconds"] < best[phase]["seconds"]:
+                best[phase] = result
+
+    # One more untimed run of both phases counts the file system calls
+    with FileCallCounter() as counter:
+        plan = scan_folder(tree.path, settings)
+    best["scan"]["file_calls_per_file"] = counter.per_file(len(plan.files))
+    dest = empty_dest(tree, work_dir)
+    engine = create_engine(settings)
+    with FileCallCounter() as counter:
+        engine.run([(plan, dest, mode)], plan.total_size)
+    best["copy"]["file_calls_per_file"] = counter.per_file(len(plan.files))
+    return best
+
+
+def compare(results, baseline, tolerance):
+    # Returns the regressions as text lines
+    regressions = []
+    for tree_name, phases in results.items():
+        for phase, result in phases.items():
+            old = baseline.get("results", {}).get(tree_name, {}).get(phase)
+            if not old or not old["seconds"]:
+                continue
+            ratio = result["seconds"] / old["seconds"]
+            line = f"{tree_name}/{phase}: {old['seconds']:.4f} s -> {result['seconds']:.4f} s ({ratio:.2f}x)"
+            print(line)
+            if ratio > 1 + tolerance:
+                regressions.append(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.copy_benchmark",
+        description="Time the folder scan and copy phases on generated save trees.",
+    )
+    parser.add_argument(
+        "--tree",
+        action="append",
+        choices=sorted(TREES),
+        help="only run this tree (can be repeated)",
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiply tree sizes by this"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--mode", choices=["copy", "dedup", "snapshot"], default="copy"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs per tree, the fastest is kept"
+    )
+    parser.add_argument(
+        "--work-dir", help="where trees are generated (default: a temporary folder)"
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against an earlier --output file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        stream=sys.stderr,
+    )
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="savemanager_bench_")
+    results: dict = {}
+    try:
+        for name in args.tree or list(TREES):
+            tree = generate_tree(name, work_dir, args.scale, args.seed)
+            results[name] = run_tree(tree, work_dir, args.mode, max(1, args.repeat))
+            for phase, result in results[name].items():
+                calls = result["file_calls_per_file"] or {}
+                print(
+                    f"{name}/{phase}: {result['seconds']:.4f} s, {result['mb_per_second']} MB/s, {result['files_per_second']} files/s, {calls.get('total')} file calls/file ({calls.get('stat', 0)} stat, {calls.get('open', 0)} open), {result['read_write_syscalls_per_file']} read/write syscalls/file"
+                )
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "time": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "mode": args.mode,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if (baseline.get("scale"), baseline.get("mode")) != (args.scale, args.mode):
+            print("Warning: the baseline was run with another --scale or --mode")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
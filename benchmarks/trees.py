@@ -0,0 +1,103 @@
+import os
+import random
+from typing import NamedTuple
+
+
+class TreeInfo(NamedTuple):
+    name: str
+    path: str
+    files: int
+    bytes: int
+    settings: dict  # copy settings the tree is meant to be copied with
+
+
+def write_file(path, size, rng):
+    # randbytes is slow for big files, so big files repeat a random block
+    block = rng.randbytes(min(size, 1024 * 1024))
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+
+
+def tiny_files(root, scale, rng):
+    # Lots of small saves and configs, the common case for game saves
+    files = 0
+    total = 0
+    for folder_index in range(max(1, int(50 * scale))):
+        folder = os.path.join(root, f"profile_{folder_index:03d}")
+        os.makedirs(folder, exist_ok=True)
+        for file_index in range(100):
+            size = rng.randint(64, 8192)
+            write_file(os.path.join(folder, f"slot_{file_index:03d}.sav"), size, rng)
+            files += 1
+            total += size
+    return files, total, {}
+
+
+def huge_files(root, scale, rng):
+    # A few big files, e.g. emulator memory cards or open world saves
+    os.makedirs(root, exist_ok=True)
+    files = 0
+    total = 0
+    for file_index in range(4):
+        size = max(1024 * 1024, int(128 * 1024**2 * scale))
+        write_file(os.path.join(root, f"world_{file_index}.dat"), size, rng)
+        files += 1
+        total += size
+    return files, total, {}
+
+
+def deep_nesting(root, scale, rng):
+    # Long chains of folders with one or two files per level
+    files = 0
+    total = 0
+    for chain in range(max(1, int(20 * scale))):
+        folder = os.path.join(root, f"chain_{chain:02d}")
+        for depth in range(40):
+            folder = os.path.join(folder, f"level_{depth:02d}")
+            os.makedirs(folder, exist_ok=True)
+            for file_index in range(rng.randint(1, 2)):
+                size = rng.randint(128, 4096)
+                write_file(os.path.join(folder, f"data_{file_index}.bin"), size, rng)
+                files += 1
+                total += size
+    return files, total, {}
+
+
+def hidden_and_ignored(root, scale, rng):
+    # Half of the tree is left out by the hidden file and ignored folder
+    # settings; counts are for the files that get copied
+    files = 0
+    total = 0
+    ignored = os.path.join(root, "shader_cache")
+    for folder_name in ("saves", ".backup", "shader_cache"):
+        folder = os.path.join(root, folder_name)
+        os.makedirs(folder, exist_ok=True)
+        for file_index in range(max(1, int(1000 * scale))):
+            name = f"file_{file_index:04d}.sav"
+            if file_index % 4 == 0:
+                name = "." + name
+            size = rng.randint(256, 16384)
+            write_file(os.path.join(folder, name), size, rng)
+            if folder_name == "saves" and not name.startswith("."):
+                files += 1
+                total += size
+    return files, total, {"skip_hidden_files": True, "ignored_folders": [ignored]}
+
+
+TREES = {
+    "tiny_files": tiny_files,
+    "huge_files": huge_files,
+    "deep_nesting": deep_nesting,
+    "hidden_and_ignored": hidden_and_ignored,
+}
+
+
+def generate_tree(name, root, scale=1.0, seed=0):
+    # Same seed and scale give the same tree, byte for byte
+    rng = random.Random(f"{name}-{seed}")
+    path = os.path.join(root, name)
+    files, total, settings = TREES[name](path, scale, rng)
+    return TreeInfo(name, path, files, total, settings)
@@ -1,15 +1,376 @@
-import py7zr
+import os
+import json
+import lzma
+import time
+import zlib
+import struct
 import shutil
+import hashlib
+import concurrent.futures
 
 
 output_archive = "C:\\Users\\Admin\\Documents\\work\\projects\\VSCodeProjects\\SaveManager\\main\\source.7z"
+# Upload next to source.7z; the installer uses it to download only changed files
+output_manifest = "C:\\Users\\Admin\\Documents\\work\\projects\\VSCodeProjects\\SaveManager\\main\\manifest.json"
 distpath = "C:\\Users\\Admin\\Documents\\work\\projects\\VSCodeProjects\\SaveManager\\main\\SaveManager.dist"
-compression_filters = [{'id': py7zr.FILTER_LZMA2, 'preset': py7zr.PRESET_DEFAULT}]
+# Compressed blocks of earlier builds, reused when their files didn't change
+cache_dir = "C:\\Users\\Admin\\Documents\\work\\projects\\VSCodeProjects\\SaveManager\\main\\archive_cache"
+
+compression_preset = 6  # same as py7zr.PRESET_DEFAULT
+dict_size = 16 * 1024 * 1024
+block_size = 32 * 1024 * 1024  # small files are packed into solid blocks this big
+cache_limit = 2 * 1024**3  # oldest cached blocks are removed above this size
+
+# 7z format constants
+SIGNATURE = b"7z\xbc\xaf\x27\x1c\x00\x04"
+LZMA2_ID = b"\x21"
+K_END = 0x00
+K_HEADER = 0x01
+K_MAIN_STREAMS_INFO = 0x04
+K_FILES_INFO = 0x05
+K_PACK_INFO = 0x06
+K_UNPACK_INFO = 0x07
+K_SUBSTREAMS_INFO = 0x08
+K_SIZE = 0x09
+K_CRC = 0x0A
+K_FOLDER = 0x0B
+K_CODERS_UNPACK_SIZE = 0x0C
+K_NUM_UNPACK_STREAM = 0x0D
+K_EMPTY_STREAM = 0x0E
+K_EMPTY_FILE = 0x0F
+K_NAME = 0x11
+K_MTIME = 0x14
+K_ATTRIBUTES = 0x15
+FILE_ATTRIBUTE_DIRECTORY = 0x10
+FILE_ATTRIBUTE_ARCHIVE = 0x20
+
+
+def write_number(value):
+    # 7z variable length integer: the leading 1 bits of the first byte count
+    # the little endian bytes that follow
+    for extra in range(8):
+        if value < 1 << (7 * (extra + 1)):
+            first = ((0xFF << (8 - extra)) & 0xFF) | (value >> (8 * extra))
+            low = value & ((1 << (8 * extra)) - 1)
+            return bytes([first]) + low.to_bytes(extra, "little")
+    return b"\xff" + value.to_bytes(8, "little")
+
+
+def write_bits(bits):
+    data = bytearray((len(bits) + 7) // 8)
+    for index, bit in enumerate(bits):
+        if bit:
+            data[index // 8] |= 0x80 >> (index % 8)
+    return bytes(data)
+
+
+def lzma2_dict_property(size):
+    # Smallest property byte whose dictionary (2 or 3 << n) holds size
+    for prop in range(40):
+        if (2 | (prop & 1)) << (prop // 2 + 11) >= size:
+            return prop
+    return 40
+
+
+def hash_file(path):
+    # sha256 for the block cache, crc32 for the 7z header, in one read
+    sha = hashlib.sha256()
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            sha.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+    return sha.hexdigest(), crc
+
+
+def compress_block(paths):
+    # Runs in a worker process: one solid block is the files' contents back
+    # to back, compressed as a raw LZMA2 stream
+    compressor = lzma.LZMACompressor(
+        format=lzma.FORMAT_RAW,
+        filters=[
+            {
+                "id": lzma.FILTER_LZMA2,
+                "preset": compression_preset,
+                "dict_size": dict_size,
+            }
+        ],
+    )
+    chunks = []
+    for path in paths:
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                chunks.append(compressor.compress(chunk))
+    chunks.append(compressor.flush())
+    return b"".join(chunks)
+
+
+def scan_dist(root):
+    # (archive name, path, size, mtime_ns) for files and (name, None, 0, mtime_ns)
+    # for folders, sorted by name so blocks come out the same for every build
+    entries = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        for name in dir_names + file_names:
+            path = os.path.join(dir_path, name)
+            stat_result = os.stat(path)
+            arcname = os.path.relpath(path, root).replace(os.sep, "/")
+            if name in dir_names:
+                entries.append((arcname, None, 0, stat_result.st_mtime_ns))
+            else:
+                entries.append(
+                    (arcname, path, stat_result.st_size, stat_result.st_mtime_ns)
+                )
+    entries.sort()
+    return entries
+
+
+def plan_blocks(files):
+    # Big files (DLLs, the exe) get a block of their own so an unchanged one
+    # is always a cache hit; small files are grouped per folder
+    blocks = []
+    current = []
+    current_size = 0
+    current_folder = None
+    for file in files:
+        arcname, path, size, mtime_ns, sha, crc = file
+        if size >= block_size // 2:
+            blocks.append([file])
+            continue
+        folder = os.path.dirname(arcname)
+        if current and (folder != current_folder or current_size + size > block_size):
+            blocks.append(current)
+            current, current_size = [], 0
+        current.append(file)
+        current_size += size
+        current_folder = folder
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def block_key(block):
+    key = hashlib.sha256(f"{compression_preset}:{dict_size}".encode())
+    for arcname, path, size, mtime_ns, sha, crc in block:
+        key.update(sha.encode())
+    return key.hexdigest()
+
+
+def trim_cache(used_keys):
+    entries = [
+        (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+        for entry in os.scandir(cache_dir)
+        if entry.name.endswith(".lzma2") and entry.name[:-6] not in used_keys
+    ]
+    total = sum(entry.stat().st_size for entry in os.scandir(cache_dir))
+    for _, size, path in sorted(entries):
+        if total <= cache_limit:
+            break
+        os.remove(path)
+        total -= size
+
+
+def filetime(mtime_ns):
+    return mtime_ns // 100 + 116444736000000000
+
+
+def build_header(blocks, pack_sizes, empty_entries):
+    header = bytearray([K_HEADER])
+
+    if blocks:
+        header += bytes([K_MAIN_STREAMS_INFO, K_PACK_INFO])
+        header += write_number(0) + write_number(len(blocks))
+        header += bytes([K_SIZE])
+        for pack_size in pack_sizes:
+            header += write_number(pack_size)
+        header += bytes([K_END])
+
+        header += bytes([K_UNPACK_INFO, K_FOLDER]) + write_number(len(blocks)) + b"\x00"
+        coder = bytes([0x20 | len(LZMA2_ID)]) + LZMA2_ID
+        coder += write_number(1) + bytes([lzma2_dict_property(dict_size)])
+        for _ in blocks:
+            header += write_number(1) + coder
+        header += bytes([K_CODERS_UNPACK_SIZE])
+        for block in blocks:
+            header += write_number(sum(file[2] for file in block))
+        header += bytes([K_END])
+
+        header += bytes([K_SUBSTREAMS_INFO, K_NUM_UNPACK_STREAM])
+        for block in blocks:
+            header += write_number(len(block))
+        header += bytes([K_SIZE])
+        for block in blocks:
+            # The last size of a block follows from the block's unpack size
+            for file in block[:-1]:
+                header += write_number(file[2])
+        header += bytes([K_CRC, 1])
+        for block in blocks:
+            for file in block:
+                header += struct.pack("<I", file[5])
+        header += bytes([K_END, K_END])
+
+    # Files with data first, in block order, then empty files and folders
+    entries = [file[:4] for block in blocks for file in block] + empty_entries
+    stream_count = len(entries) - len(empty_entries)
+    header += bytes([K_FILES_INFO]) + write_number(len(entries))
+
+    def add_property(property_id, data):
+        nonlocal header
+        header += bytes([property_id]) + write_number(len(data)) + data
+
+    if empty_entries:
+        add_property(
+            K_EMPTY_STREAM,
+            write_bits([index >= stream_count for index in range(len(entries))]),
+        )
+        add_property(
+            K_EMPTY_FILE,
+            write_bits([path is not None for _, path, _, _ in empty_entries]),
+        )
+    add_property(
+        K_NAME,
+        b"\x00"
+        + b"".join((name + "\0").encode("utf-16-le") for name, _, _, _ in entries),
+    )
+    add_property(
+        K_MTIME,
+        b"\x01\x00"
+        + b"".join(
+            struct.pack("<Q", filetime(mtime_ns)) for _, _, _, mtime_ns in entries
+        ),
+    )
+    add_property(
+        K_ATTRIBUTES,
+        b"\x01\x00"
+        + b"".join(
+            struct.pack(
+                "<I",
+                FILE_ATTRIBUTE_DIRECTORY if path is None else FILE_ATTRIBUTE_ARCHIVE,
+            )
+            for _, path, _, _ in entries
+        ),
+    )
+    header += bytes([K_END, K_END])
+    return bytes(header)
+
+
+def write_manifest(path, archive_path, blocks, pack_sizes, empty_entries):
+    # Format read by savemanager/delta_update.py: where every file's bytes are
+    # in which independently compressed block
+    manifest = {
+        "format": 1,
+        "archive": os.path.basename(archive_path),
+        "dict_size": dict_size,
+        "blocks": [],
+        "files": [],
+        "folders": [name for name, path, _, _ in empty_entries if path is None],
+    }
+    pack_offset = 32  # after the signature header
+    for index, (block, pack_size) in enumerate(zip(blocks, pack_sizes)):
+        manifest["blocks"].append(
+            {
+                "offset": pack_offset,
+                "packed_size": pack_size,
+                "size": sum(file[2] for file in block),
+            }
+        )
+        pack_offset += pack_size
+        offset = 0
+        for arcname, file_path, size, mtime_ns, sha, crc in block:
+            manifest["files"].append(
+                {
+                    "name": arcname,
+                    "size": size,
+                    "sha256": sha,
+                    "block": index,
+                    "offset": offset,
+                }
+            )
+            offset += size
+    empty_sha = hashlib.sha256().hexdigest()
+    for name, file_path, _, _ in empty_entries:
+        if file_path is not None:
+            manifest["files"].append(
+                {
+                    "name": name,
+                    "size": 0,
+                    "sha256": empty_sha,
+                    "block": None,
+                    "offset": 0,
+                }
+            )
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+
+
+def create_archive(output_path, root, manifest_path=None):
+    timings = {}
+
+    stage_start = time.perf_counter()
+    entries = scan_dist(root)
+    files = [entry for entry in entries if entry[1] is not None and entry[2] > 0]
+    empty_entries = [entry for entry in entries if entry[1] is None or entry[2] == 0]
+    timings["scan"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        hashes = list(executor.map(hash_file, [file[1] for file in files]))
+    files = [file + file_hash for file, file_hash in zip(files, hashes)]
+    blocks = plan_blocks(files)
+    keys = [block_key(block) for block in blocks]
+    timings["hash"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_paths = [os.path.join(cache_dir, f"{key}.lzma2") for key in keys]
+    missing = [
+        index for index, path in enumerate(cache_paths) if not os.path.exists(path)
+    ]
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        futures = {
+            executor.submit(compress_block, [file[1] for file in blocks[index]]): index
+            for index in missing
+        }
+        for future in concurrent.futures.as_completed(futures):
+            cache_path = cache_paths[futures[future]]
+            with open(cache_path + ".tmp", "wb") as f:
+                f.write(future.result())
+            os.replace(cache_path + ".tmp", cache_path)
+    timings["compress"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    pack_sizes = []
+    with open(output_path + ".tmp", "wb") as f:
+        f.write(bytes(32))  # signature header, written last
+        for cache_path in cache_paths:
+            with open(cache_path, "rb") as block_file:
+                shutil.copyfileobj(block_file, f, 1024 * 1024)
+            pack_sizes.append(os.path.getsize(cache_path))
+            os.utime(cache_path)  # recently used blocks are kept by trim_cache
+        header = build_header(blocks, pack_sizes, empty_entries)
+        f.write(header)
+        start_header = struct.pack(
+            "<QQI", sum(pack_sizes), len(header), zlib.crc32(header)
+        )
+        f.seek(0)
+        f.write(SIGNATURE + struct.pack("<I", zlib.crc32(start_header)) + start_header)
+    os.replace(output_path + ".tmp", output_path)
+    trim_cache(set(keys))
+    if manifest_path:
+        write_manifest(manifest_path, output_path, blocks, pack_sizes, empty_entries)
+    timings["write"] = time.perf_counter() - stage_start
+
+    total_size = sum(file[2] for file in files)
+    print(
+        f"{len(files)} files ({total_size / 1024**2:.1f} MB) in {len(blocks)} blocks, {len(blocks) - len(missing)} from cache, archive {os.path.getsize(output_path) / 1024**2:.1f} MB"
+    )
+    for stage, seconds in timings.items():
+        print(f"{stage:>10}: {seconds:.2f} s")
+
 
 def main():
-    with py7zr.SevenZipFile(output_archive, mode='w', filters=compression_filters) as archive:
-        archive.writeall(path=distpath, arcname="")
+    create_archive(output_archive, distpath, output_manifest)
     shutil.rmtree(distpath)
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,2 @@
+# GUI-independent parts of SaveManager (copy engine and helpers).
+# Nothing in this package may import dearpygui, dxcam or win32 modules.
@@ -0,0 +1,5 @@
+import sys
+from savemanager.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,227 @@
+import os
+import lzma
+import queue
+import logging
+import tarfile
+import threading
+import collections
+import concurrent.futures
+from savemanager.snapshots import new_snapshot_name, PARTIAL_SUFFIX
+
+
+ARCHIVE_SUFFIX = ".tar.xz"
+ARCHIVE_PRESET = 6  # xz compression level
+BLOCK_SIZE = 8 * 1024 * 1024  # tar stream bytes compressed as one xz stream
+READ_SIZE = 4 * 1024 * 1024  # bytes per read job, big files are split
+DEFAULT_READERS = 4
+
+
+def compress_block(data, preset=ARCHIVE_PRESET):
+    # Runs in a compressor thread; lzma releases the GIL while it compresses.
+    # Every block is a complete xz stream; xz, 7-Zip and Python's tarfile
+    # read concatenated streams as one file.
+    return lzma.compress(data, format=lzma.FORMAT_XZ, preset=preset)
+
+
+def read_piece(src_path, offset, length):
+    with open(src_path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def default_compressor_count():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+class ArchiveWriter:
+    # Streams a folder pair into one dest/<name>_<date>.tar.xz file. Slow
+    # network and USB destinations get one sequential write instead of a file
+    # create per save file. Three stages overlap:
+    #   reader threads    read files in pieces, a bounded window ahead
+    #   compressors       a thread pool compresses BLOCK_SIZE parts of the tar
+    #   writer thread     writes the compressed blocks in order
+    def __init__(
+        self,
+        progress,
+        cancel_flag,
+        log_callback=None,
+        readers=DEFAULT_READERS,
+        compressors=None,
+        preset=ARCHIVE_PRESET,
+    ):
+        self.progress = progress  # ProgressCounters
+        self.cancel_flag = cancel_flag
+        self.log_callback = log_callback
+        self.readers = max(1, readers)
+        self.compressors = compressors or default_compressor_count()
+        self.preset = preset
+
+    def log(self, level, message):
+        if self.log_callback is not None:
+            self.log_callback(level, message)
+
+    def archive_path(self, plan, dest):
+        name = os.path.basename(os.path.normpath(plan.source)) or "archive"
+
+        def path_for(date):
+            return os.path.join(dest, f"{name}_{date}{ARCHIVE_SUFFIX}")
+
+        # A run in the same second gets a _2 suffix instead of replacing the
+        # archive, the same as snapshots
+        date = new_snapshot_name(
+            lambda date: os.path.exists(path_for(date))
+            or os.path.exists(path_for(date) + PARTIAL_SUFFIX)
+        )
+        return path_for(date)
+
+    def write(self, plan, dest):
+        # Returns the archive path, or None if cancelled
+        path = self.archive_path(plan, dest)
+        partial_path = path + PARTIAL_SUFFIX
+        for level, message in plan.skipped:
+            self.log(level, message)
+
+        blocks: queue.Queue = queue.Queue(maxsize=self.compressors * 2)
+        writer_errors: list = []
+        writer = threading.Thread(
+            target=self._write_blocks,
+            args=(partial_path, blocks, writer_errors),
+            name="archive_writer",
+        )
+        writer.start()
+        try:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.compressors, thread_name_prefix="archive_compressor"
+            ) as compress_pool, concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.readers, thread_name_prefix="archive_reader"
+            ) as read_pool:
+                stream = TarStream(
+                    lambda data: blocks.put(
+                        compress_pool.submit(compress_block, data, self.preset)
+                    )
+                )
+                self._add_entries(plan, stream, read_pool, writer_errors)
+                if not self.cancel_flag.is_set():
+                    stream.close()
+        finally:
+            blocks.put(None)
+            writer.join()
+
+        if writer_errors or self.cancel_flag.is_set():
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            if writer_errors:
+                raise writer_errors[0]
+            return None
+        os.replace(partial_path, path)
+        logging.debug(f"Archive written: {path}")
+        return path
+
+    def _add_entries(self, plan, stream, read_pool, writer_errors):
+        for rel_dir_path in plan.dirs:
+            if rel_dir_path != ".":
+                info = tarfile.TarInfo(rel_dir_path.replace(os.sep, "/"))
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                stream.add_header(info)
+
+        # Read jobs are queued in archive order; the window keeps the readers
+        # a few pieces ahead of the tar stream
+        pieces = (
+            (planned_file, offset, min(READ_SIZE, planned_file.size - offset))
+            for planned_file in plan.files
+            for offset in range(0, max(planned_file.size, 1), READ_SIZE)
+        )
+        window = collections.deque()
+        current = None
+        for planned_file, offset, length in pieces:
+            future = read_pool.submit(read_piece, planned_file.src_path, offset, length)
+            window.append((planned_file, length, future))
+            if len(window) < self.readers * 4:
+                continue
+            current = self._add_piece(stream, *window.popleft(), current)
+            if self.cancel_flag.is_set() or writer_errors:
+                return
+        while window:
+            current = self._add_piece(stream, *window.popleft(), current)
+            if self.cancel_flag.is_set() or writer_errors:
+                return
+        if current is not None:
+            self._finish_file(stream, current)
+
+    def _add_piece(self, stream, planned_file, length, future, current):
+        # Returns the file now being written to the tar stream
+        if planned_file is not current:
+            if current is not None:
+                self._finish_file(stream, current)
+            self.progress.set_current_file(planned_file.rel_path)
+            info = tarfile.TarInfo(planned_file.rel_path.replace(os.sep, "/"))
+            info.size = planned_file.size
+            info.mtime = planned_file.mtime_ns / 1e9
+            info.mode = 0o644
+            stream.add_header(info)
+        # The header already promised the scanned size, so gaps are zero filled
+        try:
+            data = future.result()
+        except OSError as e:
+            self.log("error", f"Could not read '{planned_file.rel_path}': {e}")
+            data = bytes(length)
+        if len(data) < length:
+            self.log(
+                "error",
+                f"File changed while it was archived: '{planned_file.rel_path}'",
+            )
+            data += bytes(length - len(data))
+        stream.add_data(data[:length])
+        self.progress.add_bytes(length)
+        return planned_file
+
+    def _finish_file(self, stream, planned_file):
+        stream.pad()
+        self.progress.file_done()
+        self.log("copy", f"Archived: '{planned_file.rel_path}'")
+
+    def _write_blocks(self, path, blocks, writer_errors):
+        try:
+            with open(path, "wb") as f:
+                while (future := blocks.get()) is not None:
+                    if not writer_errors:
+                        f.write(future.result())
+        except Exception as e:
+            writer_errors.append(e)
+            # Keep draining so the producer never blocks on a full queue
+            while blocks.get() is not None:
+                pass
+
+
+class TarStream:
+    # Builds the tar byte stream and hands it to `emit` in BLOCK_SIZE parts
+    def __init__(self, emit):
+        self.emit = emit
+        self.buffer = bytearray()
+        self.size = 0
+
+    def add_header(self, info):
+        self._add(info.tobuf(format=tarfile.PAX_FORMAT))
+
+    def add_data(self, data):
+        self._add(data)
+
+    def pad(self):
+        remainder = self.size % tarfile.BLOCKSIZE
+        if remainder:
+            self._add(bytes(tarfile.BLOCKSIZE - remainder))
+
+    def close(self):
+        # End of archive marker, then the rest of the buffer
+        self._add(bytes(tarfile.BLOCKSIZE * 2))
+        if self.buffer:
+            self.emit(bytes(self.buffer))
+            self.buffer.clear()
+
+    def _add(self, data):
+        self.buffer += data
+        self.size += len(data)
+        if len(self.buffer) >= BLOCK_SIZE:
+            self.emit(bytes(self.buffer))
+            self.buffer.clear()
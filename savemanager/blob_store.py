@@ -0,0 +1,144 @@
+import os
+import json
+import uuid
+import logging
+import threading
+from savemanager.snapshots import new_snapshot_name, snapshot_sort_key
+
+
+STORE_DIR_NAME = ".savemanager"
+
+
+class BlobStore:
+    # Content-addressed store kept inside the destination folder:
+    #   .savemanager/blobs/<first 2 hex chars>/<hash>   file contents, stored once
+    #   .savemanager/snapshots/<timestamp>.json       rel path -> [hash, size, mtime_ns]
+    # The destination tree itself is made of hardlinks to the blobs, or copies
+    # of them where the file system has no hardlinks
+    def __init__(self, dest):
+        self.dest = dest
+        self.root = os.path.join(dest, STORE_DIR_NAME)
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.snapshot_dir = os.path.join(self.root, "snapshots")
+        self.temp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+        self.previous: dict = self.load_latest_index()
+        self.index: dict = {}
+        self.can_link = True
+        self._lock = threading.Lock()
+        self._content_locks: dict = {}
+
+    def list_snapshots(self):
+        # Oldest first
+        return sorted(
+            (
+                name[:-5]
+                for name in os.listdir(self.snapshot_dir)
+                if name.endswith(".json")
+            ),
+            key=snapshot_sort_key,
+        )
+
+    def load_index(self, snapshot_name):
+        with open(os.path.join(self.snapshot_dir, f"{snapshot_name}.json"), "r") as f:
+            return json.load(f)["files"]
+
+    def load_latest_index(self):
+        snapshots = self.list_snapshots()
+        if not snapshots:
+            return {}
+        try:
+            return self.load_index(snapshots[-1])
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(
+                f"Ignoring unreadable snapshot index '{snapshots[-1]}': {e}"
+            )
+            return {}
+
+    def cached_hash(self, rel_path, size, mtime_ns):
+        # Reuse the hash from the last snapshot if the file looks unchanged
+        entry = self.previous.get(rel_path)
+        if entry is not None and entry[1] == size and entry[2] == mtime_ns:
+            return entry[0]
+        return None
+
+    def blob_path(self, file_hash):
+        return os.path.join(self.blob_dir, file_hash[:2], file_hash)
+
+    def content_lock(self, file_hash):
+        # Serializes workers that found the same new content at the same time
+        with self._lock:
+            if file_hash not in self._content_locks:
+                self._content_locks[file_hash] = threading.Lock()
+            return self._content_locks[file_hash]
+
+    def has_blob(self, file_hash):
+        return os.path.exists(self.blob_path(file_hash))
+
+    def new_temp_path(self):
+        return os.path.join(self.temp_dir, uuid.uuid4().hex)
+
+    def add_blob(self, file_hash, temp_path):
+        blob_path = self.blob_path(file_hash)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        if os.path.exists(blob_path):
+            # Another worker stored the same content first
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, blob_path)
+
+    def link(self, file_hash, dest_path):
+        # Returns False if the filesystem can't hardlink; the caller copies instead
+        blob_path = self.blob_path(file_hash)
+        try:
+            if os.path.samefile(blob_path, dest_path):
+                return True
+        except OSError:
+            pass
+        if not self.can_link:
+            return False
+
+        temp_path = self.new_temp_path()
+        try:
+            os.link(blob_path, temp_path)
+        except OSError as e:
+            logging.debug(f"Hardlinks not available in '{self.dest}': {e}")
+            self.can_link = False
+            return False
+        os.replace(temp_path, dest_path)
+        return True
+
+    def has_copy(self, rel_path, file_hash, size, mtime_ns, dest_path):
+        # Without hardlinks the destination holds copies of the blobs. One made
+        # by an earlier run is still current if the last snapshot has the same
+        # source file and the copy is still there.
+        if self.previous.get(rel_path) != [file_hash, size, mtime_ns]:
+            return False
+        try:
+            return os.path.getsize(dest_path) == size
+        except OSError:
+            return False
+
+    def clean_temp(self):
+        for name in os.listdir(self.temp_dir):
+            try:
+                os.remove(os.path.join(self.temp_dir, name))
+            except OSError as e:
+                logging.warning(f"Could not remove temporary file '{name}': {e}")
+
+    def record(self, rel_path, file_hash, size, mtime_ns):
+        with self._lock:
+            self.index[rel_path] = [file_hash, size, mtime_ns]
+
+    def save_index(self):
+        snapshot_name = new_snapshot_name(
+            lambda name: os.path.exists(os.path.join(self.snapshot_dir, f"{name}.json"))
+        )
+        snapshot_path = os.path.join(self.snapshot_dir, f"{snapshot_name}.json")
+        with self._lock:
+            with open(snapshot_path, "w") as f:
+                json.dump({"files": self.index}, f)
+        logging.debug(f"Saved snapshot index with {len(self.index)} files")
+        return snapshot_path
@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import argparse
+import threading
+from savemanager.settings import get_default_copy_settings, load_settings_file
+from savemanager.scanner import scan_folder
+from savemanager.path_filter import PathFilter
+from savemanager.copy_engine import CopyEngine, clear_destination_folder
+from savemanager.progress import ProgressCounters
+
+
+PROGRESS_INTERVAL = 0.25  # seconds between progress lines
+# Copy workers emit log lines from their own threads; one writer at a time
+# keeps every line a complete JSON object
+_emit_lock = threading.Lock()
+
+
+def get_default_data_dir():
+    # Script/installed build keeps app_data next to it, onefile build in LOCALAPPDATA
+    if os.path.isdir("app_data"):
+        return os.path.abspath("app_data")
+    local_app_data = os.getenv("LOCALAPPDATA")
+    if local_app_data:
+        return os.path.join(local_app_data, "SaveManager", "app_data")
+    return os.path.abspath("app_data")
+
+
+def emit(event, **data):
+    line = json.dumps({"event": event, "time": time.time(), **data}) + "\n"
+    with _emit_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+def load_folder_pairs(json_file_path):
+    with open(json_file_path, "r") as f:
+        entries = json.load(f)
+    return [
+        (
+            entry["name"],
+            entry["source"],
+            entry["destination"],
+            entry.get("mode", "copy"),
+            entry.get("exclude", []),
+        )
+        for entry in entries
+    ]
+
+
+def plan_folder_pairs(entries, settings):
+    # Same checks as copy_all_callback in SaveManager.py
+    path_filter = PathFilter.from_settings(settings)
+    folder_pairs = []
+    total_bytes = 0
+    for name, source, dest, mode, exclude in entries:
+        missing = [folder for folder in (source, dest) if not os.path.exists(folder)]
+        if missing:
+            emit("skip_pair", name=name, reason="missing_folder", folders=missing)
+            continue
+
+        plan = scan_folder(
+            source, settings, path_filter=path_filter.with_exclude(exclude)
+        )
+        if plan.total_size > settings["file_size_limit"] * 1024**3:
+            emit("skip_pair", name=name, reason="size_limit", size=plan.total_size)
+            continue
+
+        if settings["clear_destination_folder"] and mode != "snapshot":
+            clear_destination_folder(
+                dest, lambda level, message: emit("log", level=level, message=message)
+            )
+        if settings["copy_folder_checkbox_state"]:
+            dest = os.path.join(dest, os.path.basename(source))
+            os.makedirs(dest, exist_ok=True)
+        folder_pairs.append((plan, dest, mode))
+        total_bytes += plan.total_size
+    return folder_pairs, total_bytes
+
+
+def run_copy(args):
+    data_dir = args.data_dir or get_default_data_dir()
+    json_file_path = os.path.join(data_dir, "save_folders.json")
+    config_file = os.path.join(data_dir, "settings.ini")
+    if not os.path.exists(json_file_path):
+        emit("error", message=f"No folder pairs found: {json_file_path}")
+        return 2
+
+    settings = load_settings_file(config_file, get_default_copy_settings())
+    entries = load_folder_pairs(json_file_path)
+    if args.pair:
+        entries = [entry for entry in entries if entry[0] in args.pair]
+    if not entries:
+        emit("error", message="No folder pairs to copy")
+        return 2
+
+    folder_pairs, total_bytes = plan_folder_pairs(entries, settings)
+    if not folder_pairs:
+        emit("error", message="No folder pairs to copy (all skipped)")
+        return 2
+
+    progress = ProgressCounters()
+    cancel_flag = threading.Event()
+    engine = CopyEngine(
+        settings,
+        progress,
+        cancel_flag,
+        log_callback=lambda level, message: emit("log", level=level, message=message),
+        max_workers=settings["copy_threads"],
+        threads_per_volume=settings["copy_threads_per_volume"],
+        manifest_dir=os.path.join(data_dir, "manifests"),
+    )
+    result: dict = {}
+
+    def copy_target():
+        try:
+            result["completed"] = engine.run(folder_pairs, total_bytes)
+        except Exception as e:
+            result["error"] = str(e)
+
+    # Ctrl+C cancels like the GUI's cancel button: workers stop between slices
+    signal.signal(signal.SIGINT, lambda signum, frame: cancel_flag.set())
+    emit("start", total_bytes=total_bytes, pairs=len(folder_pairs))
+    copy_thread = threading.Thread(target=copy_target, name="copy")
+    copy_thread.start()
+
+    # Progress is sampled from the shared counters, not pushed per chunk
+    while copy_thread.is_alive():
+        copy_thread.join(PROGRESS_INTERVAL)
+        emit("progress", **progress.stats()._asdict())
+    if "error" in result:
+        emit("error", message=result["error"])
+        return 1
+    if not result.get("completed"):
+        emit("cancel", message="Copy cancelled")
+        return 130
+    emit("complete", message="Copying completed.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m savemanager",
+        description="Run SaveManager copy operations without the GUI.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    copy_parser = subparsers.add_parser(
+        "copy", help="copy all folder pairs, printing progress as JSON lines"
+    )
+    copy_parser.add_argument(
+        "--data-dir", help="folder with save_folders.json and settings.ini"
+    )
+    copy_parser.add_argument(
+        "--pair",
+        action="append",
+        metavar="NAME",
+        help="only copy this folder pair (can be repeated)",
+    )
+    args = parser.parse_args(argv)
+
+    # Logs go to stderr so stdout stays machine-readable
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        stream=sys.stderr,
+    )
+    if args.command == "copy":
+        return run_copy(args)
+    return 2
@@ -0,0 +1,530 @@
+import os
+import sys
+import errno
+import shutil
+import logging
+import threading
+import hashlib
+import concurrent.futures
+from typing import NamedTuple
+from savemanager.manifest import Manifest, hash_file
+from savemanager.blob_store import BlobStore, STORE_DIR_NAME
+from savemanager.snapshots import SnapshotWriter, start_prune_thread
+from savemanager.scheduler import group_folder_pairs
+from savemanager.archive import ArchiveWriter
+
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+DEFAULT_THREADS_PER_VOLUME = 4
+
+# Errors that mean "this kernel copy is not possible here", not a failed copy
+FALLBACK_ERRNOS = {
+    errno.ENOSYS,
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.EBADF,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+}
+
+
+def default_worker_count():
+    # Same heuristic as ThreadPoolExecutor; copying is I/O bound
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def get_volume_id(path):
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return os.path.splitdrive(os.path.abspath(path))[0].lower()
+
+
+class CopyCancelled(Exception):
+    pass
+
+
+def clear_destination_folder(destination_folder, log_callback):
+    for item in os.listdir(destination_folder):
+        if item == STORE_DIR_NAME:
+            # Keep the deduplicated store, only the linked files are cleared
+            continue
+        item_path = os.path.join(destination_folder, item)
+        try:
+            if os.path.isfile(item_path) or os.path.islink(item_path):
+                # Delete files and symbolic links
+                os.unlink(item_path)
+                log_callback("delete", f"Deleted file: '{item_path}'")
+            elif os.path.isdir(item_path):
+                # Optionally, delete subfolders and their contents
+                shutil.rmtree(item_path)
+                log_callback(
+                    "delete", f"Deleted folder and its contents: '{item_path}'"
+                )
+        except Exception as e:
+            log_callback("error", f"Failed to delete '{item_path}': {e}")
+            logging.error(f"Deleting files failed: {e}")
+
+
+class CopyTarget(NamedTuple):
+    # Per folder pair state shared by the workers copying its files
+    dest: str
+    mode: str  # "copy", "dedup" or "snapshot"
+    volume_semaphore: threading.BoundedSemaphore
+    manifest: Manifest = None
+    store: BlobStore = None
+    snapshot: SnapshotWriter = None
+
+
+# Each slice function copies at most CHUNK_SIZE bytes from the current file
+# positions and returns the number of bytes copied (0 at end of file)
+def copy_file_range_slice(f_src, f_dst, buffer):
+    return os.copy_file_range(f_src.fileno(), f_dst.fileno(), CHUNK_SIZE)
+
+
+def sendfile_slice(f_src, f_dst, buffer):
+    return os.sendfile(f_dst.fileno(), f_src.fileno(), None, CHUNK_SIZE)
+
+
+def readinto_slice(f_src, f_dst, buffer):
+    read = f_src.readinto(buffer)
+    if not read:
+        return 0
+    view = buffer[:read]
+    while view:
+        view = view[f_dst.write(view) :]
+    return read
+
+
+def get_slice_functions():
+    # Zero-copy kernel paths first, reusable buffer loop as the last resort
+    functions = []
+    if hasattr(os, "copy_file_range"):
+        functions.append(copy_file_range_slice)
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        functions.append(sendfile_slice)
+    functions.append(readinto_slice)
+    return functions
+
+
+SLICE_FUNCTIONS = get_slice_functions()
+
+
+class CopyEngine:
+    def __init__(
+        self,
+        settings,
+        progress,
+        cancel_flag,
+        log_callback=None,
+        max_workers=None,
+        threads_per_volume=None,
+        manifest_dir=None,
+    ):
+        self.settings = settings
+        self.progress = progress  # ProgressCounters
+        self.cancel_flag = cancel_flag
+        self.log_callback = log_callback
+        self.max_workers = max_workers or default_worker_count()
+        self.threads_per_volume = threads_per_volume or DEFAULT_THREADS_PER_VOLUME
+        self.manifest_dir = manifest_dir
+
+        self._lock = threading.Lock()
+        self._volume_limits: dict = {}
+        self._buffers = threading.local()
+        self.prune_thread = None
+
+    def log(self, level, message):
+        if self.log_callback is not None:
+            self.log_callback(level, message)
+
+    def _volume_semaphore(self, dest):
+        volume = get_volume_id(dest)
+        with self._lock:
+            if volume not in self._volume_limits:
+                self._volume_limits[volume] = threading.BoundedSemaphore(
+                    self.threads_per_volume
+                )
+            return self._volume_limits[volume]
+
+    def _get_buffer(self, name="buffer"):
+        # One buffer per worker thread, reused for every file it copies
+        buffer = getattr(self._buffers, name, None)
+        if buffer is None:
+            buffer = memoryview(bytearray(CHUNK_SIZE))
+            setattr(self._buffers, name, buffer)
+        return buffer
+
+    def copy_contents(self, src_path, dest_path, size, report_progress=True):
+        # Small files go through the same loop: shutil's sendfile copy also
+        # takes a 0 from the kernel as the end of the file
+        written = 0
+        slice_functions = iter(SLICE_FUNCTIONS)
+        copy_slice = next(slice_functions)
+        with open(src_path, "rb", buffering=0) as f_src, open(
+            dest_path, "wb", buffering=0
+        ) as f_dst:
+            while not self.cancel_flag.is_set():
+                try:
+                    copied = copy_slice(f_src, f_dst, self._get_buffer())
+                except OSError as e:
+                    if copy_slice is readinto_slice or e.errno not in FALLBACK_ERRNOS:
+                        raise
+                    copy_slice = next(slice_functions)
+                    continue
+                if not copied:
+                    # FUSE, overlay and some network file systems return 0 from
+                    # the kernel copies before the end of the file
+                    if written < size and copy_slice is not readinto_slice:
+                        copy_slice = next(slice_functions)
+                        continue
+                    break
+                written += copied
+                if report_progress:
+                    self.progress.add_bytes(copied)
+        return written
+
+    def copy_contents_hashed(self, src_path, dest_path):
+        # Copies through the buffer so the content is hashed in the same pass
+        file_hash = hashlib.blake2b(digest_size=20)
+        buffer = self._get_buffer()
+        written = 0
+        with open(src_path, "rb", buffering=0) as f_src, open(
+            dest_path, "wb", buffering=0
+        ) as f_dst:
+            while not self.cancel_flag.is_set():
+                copied = readinto_slice(f_src, f_dst, buffer)
+                if not copied:
+                    break
+                file_hash.update(buffer[:copied])
+                written += copied
+                self.progress.add_bytes(copied)
+        return written, file_hash.hexdigest()
+
+    def delta_copy_contents(self, src_path, dest_path):
+        # Compares the existing destination block by block and only rewrites
+        # blocks that differ; returns (bytes processed, bytes written)
+        src_buffer = self._get_buffer()
+        dest_buffer = self._get_buffer("delta_buffer")
+        offset = 0
+        changed = 0
+        with open(src_path, "rb", buffering=0) as f_src, open(
+            dest_path, "r+b", buffering=0
+        ) as f_dst:
+            while not self.cancel_flag.is_set():
+                read = f_src.readinto(src_buffer)
+                if not read:
+                    # Drop whatever the old file had past the new end
+                    f_dst.truncate(offset)
+                    break
+                dest_read = f_dst.readinto(dest_buffer)
+                if read == CHUNK_SIZE and dest_read == CHUNK_SIZE:
+                    # Comparing the bytearrays is a memcmp, memoryviews are not
+                    same = src_buffer.obj == dest_buffer.obj
+                else:
+                    same = read == dest_read and src_buffer[:read] == dest_buffer[:read]
+                if not same:
+                    f_dst.seek(offset)
+                    view = src_buffer[:read]
+                    while view:
+                        view = view[f_dst.write(view) :]
+                    changed += read
+                offset += read
+                self.progress.add_bytes(read)
+        return offset, changed
+
+    def store_file(self, planned_file, dest_path, store):
+        src_path, rel_path, size, mtime_ns = planned_file
+
+        file_hash = store.cached_hash(rel_path, size, mtime_ns)
+        if file_hash is None or not store.has_blob(file_hash):
+            file_hash = hash_file(src_path)
+
+        with store.content_lock(file_hash):
+            if store.has_blob(file_hash):
+                self.progress.remove_from_total(size)
+                stored = False
+            else:
+                temp_path = store.new_temp_path()
+                written, file_hash = self.copy_contents_hashed(src_path, temp_path)
+                if self.cancel_flag.is_set():
+                    os.remove(temp_path)
+                    self.progress.remove_from_total(written)
+                    return
+                store.add_blob(file_hash, temp_path)
+                stored = True
+
+        if not store.link(file_hash, dest_path) and not store.has_copy(
+            rel_path, file_hash, size, mtime_ns, dest_path
+        ):
+            written = self.copy_contents(
+                store.blob_path(file_hash), dest_path, size, report_progress=False
+            )
+            if written != size:
+                self.discard_copy(rel_path, dest_path, written, size)
+                return
+        store.record(rel_path, file_hash, size, mtime_ns)
+
+        if stored:
+            self.log("copy", f"Copied: '{rel_path}'")
+        else:
+            self.log("skip", f"Skipped (already stored): '{rel_path}'")
+
+    def discard_copy(self, rel_path, dest_path, written, size):
+        # Don't leave a truncated (or, for delta copies, half updated) file
+        # behind, it would be skipped next run
+        try:
+            os.remove(dest_path)
+        except OSError:
+            pass
+        if not self.cancel_flag.is_set():
+            # The file changed size while it was copied
+            self.log(
+                "error", f"Copy failed, {written} of {size} bytes copied: '{rel_path}'"
+            )
+
+    def iter_files(self, plan, dest):
+        for level, message in plan.skipped:
+            self.log(level, message)
+
+        # Ensure empty folders are copied
+        for rel_dir_path in plan.dirs:
+            if self.cancel_flag.is_set():
+                raise CopyCancelled()
+            os.makedirs(os.path.join(dest, rel_dir_path), exist_ok=True)
+
+        for planned_file in plan.files:
+            yield planned_file, os.path.join(dest, planned_file.rel_path)
+
+    def copy_file(self, planned_file, dest_path, target):
+        if self.cancel_flag.is_set():
+            return
+        self.progress.set_current_file(planned_file.rel_path)
+        try:
+            self._copy_file(planned_file, dest_path, target)
+        finally:
+            self.progress.file_done()
+
+    def _copy_file(self, planned_file, dest_path, target):
+        src_path, rel_path, size, mtime_ns = planned_file
+        manifest = target.manifest
+
+        if target.store is not None:
+            with target.volume_semaphore:
+                try:
+                    self.store_file(planned_file, dest_path, target.store)
+                except FileNotFoundError:
+                    self.log(
+                        "error", f"File deleted before it could be copied: '{rel_path}'"
+                    )
+            return
+
+        if target.snapshot is not None and target.snapshot.link_unchanged(
+            rel_path, size, mtime_ns, dest_path
+        ):
+            self.log("skip", f"Skipped (unchanged since last snapshot): '{rel_path}'")
+            self.progress.remove_from_total(size)
+            return
+
+        # Delta copy exists for files already in the destination, so it wins
+        # over "skip existing files"
+        delta_copy = (
+            self.settings["delta_copy"]
+            and target.snapshot is None
+            and size >= self.settings["delta_copy_threshold"] * 1024**2
+            and os.path.exists(dest_path)
+        )
+        file_hash = None
+        if manifest is not None:
+            # Incremental mode: the manifest decides, not the existing file
+            if manifest.is_unchanged(rel_path, size, mtime_ns) and os.path.exists(
+                dest_path
+            ):
+                manifest.keep(rel_path)
+                self.log("skip", f"Skipped (unchanged): '{rel_path}'")
+                self.progress.remove_from_total(size)
+                return
+            if self.settings["incremental_hash"]:
+                try:
+                    file_hash = hash_file(src_path)
+                except FileNotFoundError:
+                    self.log(
+                        "error", f"File deleted before it could be copied: '{rel_path}'"
+                    )
+                    return
+                if manifest.hash_matches(rel_path, file_hash) and os.path.exists(
+                    dest_path
+                ):
+                    manifest.record(rel_path, size, mtime_ns, file_hash)
+                    self.log("skip", f"Skipped (same content): '{rel_path}'")
+                    self.progress.remove_from_total(size)
+                    return
+        elif (
+            not delta_copy
+            and os.path.exists(dest_path)
+            and self.settings["skip_existing_files"] == True
+        ):
+            self.log("skip", f"Skipped (already exists): '{rel_path}'")
+            self.progress.remove_from_total(size)
+            return
+
+        with target.volume_semaphore:
+            try:
+                if delta_copy:
+                    written, changed = self.delta_copy_contents(src_path, dest_path)
+                else:
+                    written = self.copy_contents(src_path, dest_path, size)
+            except FileNotFoundError:
+                self.log(
+                    "error", f"File deleted before it could be copied: '{rel_path}'"
+                )
+                return
+
+            if written != size:
+                self.discard_copy(rel_path, dest_path, written, size)
+                self.progress.remove_from_total(size - written)
+                return
+
+            if target.snapshot is not None:
+                # The next snapshot compares against this mtime
+                os.utime(dest_path, ns=(mtime_ns, mtime_ns))
+
+        if manifest is not None:
+            manifest.record(rel_path, size, mtime_ns, file_hash)
+        if delta_copy:
+            changed_mb = changed / 1024**2
+            self.log(
+                "copy", f"Copied (delta, {changed_mb:.1f} MB changed): '{rel_path}'"
+            )
+        else:
+            self.log("copy", f"Copied: '{rel_path}'")
+
+    def archive_folder(self, plan, dest):
+        # The whole pair becomes one compressed file, written by its own pipeline
+        writer = ArchiveWriter(self.progress, self.cancel_flag, self.log_callback)
+        if writer.write(plan, dest) is None:
+            raise CopyCancelled()
+
+    def create_target(self, plan, dest, mode):
+        volume_semaphore = self._volume_semaphore(dest)
+        if mode == "dedup":
+            return CopyTarget(dest, mode, volume_semaphore, store=BlobStore(dest))
+        if mode == "snapshot":
+            snapshot = SnapshotWriter(dest)
+            return CopyTarget(snapshot.path, mode, volume_semaphore, snapshot=snapshot)
+        if self.settings["incremental_copy"] and self.manifest_dir:
+            manifest = Manifest.for_folder_pair(self.manifest_dir, plan.source, dest)
+            return CopyTarget(dest, mode, volume_semaphore, manifest=manifest)
+        return CopyTarget(dest, mode, volume_semaphore)
+
+    def finish_targets(self, targets, completed):
+        snapshot_dests = []
+        for target in targets:
+            # Files copied before a cancel or error are still recorded
+            if target.manifest is not None:
+                target.manifest.save(prune=completed)
+            # A snapshot (index) is only kept for a complete run
+            if target.store is not None:
+                if completed:
+                    target.store.save_index()
+                target.store.clean_temp()
+            if target.snapshot is not None:
+                if completed:
+                    target.snapshot.finish()
+                    snapshot_dests.append(target.snapshot.dest)
+                else:
+                    target.snapshot.abort()
+
+        if snapshot_dests:
+            retention = {
+                "keep_last": self.settings["snapshot_keep_last"],
+                "keep_hourly": self.settings["snapshot_keep_hourly"],
+                "keep_daily": self.settings["snapshot_keep_daily"],
+                "keep_weekly": self.settings["snapshot_keep_weekly"],
+            }
+            self.prune_thread = start_prune_thread(snapshot_dests, retention)
+
+    def run(self, folder_pairs, total_bytes):
+        # folder_pairs: list of (FolderPlan, dest, mode) where mode is "copy",
+        # "dedup", "snapshot" or "archive"; returns False if cancelled
+        self.progress.start(
+            total_bytes, sum(len(plan.files) for plan, _, _ in folder_pairs)
+        )
+
+        # Pairs that share no disk are copied in parallel, each group with
+        # its own workers; the pairs of a group one after another
+        groups = group_folder_pairs(folder_pairs, get_volume_id)
+        errors: list = []
+        targets: list = []
+        walked: list = []
+        logging.debug(
+            f"Copy engine started with {len(groups)} device group(s) for {len(folder_pairs)} folder pair(s)"
+        )
+
+        if len(groups) == 1:
+            self.copy_group(groups[0], len(groups), targets, errors, walked)
+        else:
+            threads = [
+                threading.Thread(
+                    target=self.copy_group,
+                    args=(group, len(groups), targets, errors, walked),
+                    name=f"copy_group_{index}",
+                )
+                for index, group in enumerate(groups)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        walked_all = len(walked) == len(groups)
+        completed = walked_all and not errors and not self.cancel_flag.is_set()
+        self.finish_targets(targets, completed)
+
+        # Surface the first worker exception, same as the single-threaded loop did
+        if errors:
+            raise errors[0]
+        return not self.cancel_flag.is_set()
+
+    def copy_group(self, folder_pairs, group_count, targets, errors, walked):
+        volumes = {get_volume_id(dest) for _, dest, _ in folder_pairs}
+        worker_count = max(
+            1,
+            min(
+                self.max_workers // group_count,
+                self.threads_per_volume * max(1, len(volumes)),
+            ),
+        )
+
+        # Bound the number of queued files so huge trees don't pile up in memory
+        in_flight = threading.BoundedSemaphore(worker_count * 4)
+
+        def task_done(future):
+            in_flight.release()
+            if future.exception() is not None:
+                errors.append(future.exception())
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=worker_count, thread_name_prefix="copy_worker"
+        ) as executor:
+            try:
+                for plan, dest, mode in folder_pairs:
+                    if mode == "archive":
+                        self.archive_folder(plan, dest)
+                        continue
+                    target = self.create_target(plan, dest, mode)
+                    targets.append(target)
+                    for planned_file, dest_path in self.iter_files(plan, target.dest):
+                        in_flight.acquire()
+                        if self.cancel_flag.is_set() or errors:
+                            in_flight.release()
+                            raise CopyCancelled()
+                        executor.submit(
+                            self.copy_file, planned_file, dest_path, target
+                        ).add_done_callback(task_done)
+                walked.append(True)
+            except CopyCancelled:
+                pass
+            except Exception as e:
+                # Stops the other groups too, then raised from run()
+                errors.append(e)
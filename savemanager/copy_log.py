@@ -0,0 +1,82 @@
+import time
+import bisect
+import collections
+from typing import NamedTuple
+
+
+DEFAULT_CAPACITY = 20000  # newest records kept, older ones are dropped
+# Levels that are shown and hidden with another level's filter button
+FILTER_LEVELS = {"missing": "skip"}  # folder pair skipped, folder not found
+
+
+class LogRecord(NamedTuple):
+    seq: int
+    time: float
+    level: str  # "copy", "skip", "missing", "ignore", "delete" or "error"
+    message: str
+
+
+class CopyLog:
+    # Bounded log model for the copy log. Workers only append to a pending
+    # deque (append/popleft are thread safe); everything else belongs to the
+    # reader (the UI thread), which drains the pending records once per frame
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._pending = collections.deque(maxlen=capacity)
+        self.records = collections.deque(maxlen=capacity)
+        self.hidden_levels: set = set()
+        self._view: list = []  # records that pass the level filter
+        self._next_seq = 0
+        self.version = 0  # changes whenever the filtered view changes
+        # Records ever added to the filtered view; unlike visible_count() it
+        # keeps growing once the ring buffer is full and old records drop out
+        self.appended = 0
+
+    def add(self, level, message):
+        self._pending.append((time.time(), level, message))
+
+    def drain(self, max_records=None):
+        drained = 0
+        while self._pending and (max_records is None or drained < max_records):
+            record_time, level, message = self._pending.popleft()
+            record = LogRecord(self._next_seq, record_time, level, message)
+            self._next_seq += 1
+            self.records.append(record)
+            if not self.is_hidden(level):
+                self._view.append(record)
+                self.appended += 1
+            drained += 1
+
+        if drained:
+            # Drop filtered records that fell out of the ring buffer
+            oldest_seq = self.records[0].seq
+            if self._view and self._view[0].seq < oldest_seq:
+                del self._view[
+                    : bisect.bisect_left(self._view, oldest_seq, key=lambda r: r.seq)
+                ]
+            self.version += 1
+        return drained
+
+    def set_level_hidden(self, level, hidden):
+        if hidden:
+            self.hidden_levels.add(level)
+        else:
+            self.hidden_levels.discard(level)
+        self._view = [
+            record for record in self.records if not self.is_hidden(record.level)
+        ]
+        self.version += 1
+
+    def is_hidden(self, level):
+        return FILTER_LEVELS.get(level, level) in self.hidden_levels
+
+    def visible_count(self):
+        return len(self._view)
+
+    def visible_records(self, start, stop):
+        return self._view[start:stop]
+
+    def clear(self):
+        self._pending.clear()
+        self.records.clear()
+        self._view = []
+        self.version += 1
@@ -0,0 +1,300 @@
+import os
+import json
+import lzma
+import hashlib
+import logging
+from savemanager.downloads import REQUEST_TIMEOUT, create_session
+
+
+# Release asset written by create_archive.py next to source.7z. It lists
+# every file with its hash and where its bytes are in the archive: each
+# block is an independent LZMA2 stream, so one block can be downloaded with
+# a Range request and decompressed on its own.
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+# Written to the install folder: what was installed, to skip hashing
+# unchanged files on the next update
+INSTALL_RECORD_NAME = "install_manifest.json"
+# Above this share of the archive a full download is about as fast
+MAX_DELTA_RATIO = 0.6
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+PARTIAL_SUFFIX = ".partial"
+BACKUP_SUFFIX = ".old"
+
+
+class DeltaUpdateError(Exception):
+    pass
+
+
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def local_path(install_dir, name):
+    # Manifest names use "/"; refuse anything that would leave install_dir
+    path = os.path.normpath(os.path.join(install_dir, *name.split("/")))
+    if os.path.commonpath([path, os.path.normpath(install_dir)]) != os.path.normpath(
+        install_dir
+    ):
+        raise DeltaUpdateError(f"Invalid file name in manifest: '{name}'")
+    return path
+
+
+def load_install_record(install_dir):
+    # name -> {"size", "mtime_ns", "sha256"}; empty if missing or unreadable
+    try:
+        with open(os.path.join(install_dir, INSTALL_RECORD_NAME), "r") as f:
+            return json.load(f)["files"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_install_record(install_dir, manifest):
+    files: dict = {}
+    for file in manifest["files"]:
+        try:
+            stat_result = os.stat(local_path(install_dir, file["name"]))
+        except OSError:
+            continue
+        files[file["name"]] = {
+            "size": stat_result.st_size,
+            "mtime_ns": stat_result.st_mtime_ns,
+            "sha256": file["sha256"],
+        }
+    with open(os.path.join(install_dir, INSTALL_RECORD_NAME), "w") as f:
+        json.dump({"format": MANIFEST_FORMAT, "files": files}, f)
+
+
+def find_changed_files(manifest, install_dir, record):
+    # Files that are missing or differ. A file that still has the size and
+    # mtime from the install record is trusted without hashing it.
+    changed = []
+    for file in manifest["files"]:
+        try:
+            stat_result = os.stat(local_path(install_dir, file["name"]))
+        except OSError:
+            changed.append(file)
+            continue
+        if stat_result.st_size != file["size"]:
+            changed.append(file)
+            continue
+        known = record.get(file["name"])
+        if (
+            known is not None
+            and known["size"] == stat_result.st_size
+            and known["mtime_ns"] == stat_result.st_mtime_ns
+        ):
+            file_hash = known["sha256"]
+        else:
+            file_hash = hash_file(local_path(install_dir, file["name"]))
+        if file_hash != file["sha256"]:
+            changed.append(file)
+    return changed
+
+
+class BlockWriter:
+    # Receives one block's decompressed bytes in order and writes the ranges
+    # of the wanted files to .partial files, hashing them on the way
+    def __init__(self, files, install_dir):
+        self.files = sorted(files, key=lambda file: file["offset"])
+        self.install_dir = install_dir
+        self.position = 0
+        self.index = 0
+        self.handle = None
+        self.sha = None
+        self.written: list = []  # (partial path, final path)
+
+    def done(self):
+        return self.index >= len(self.files)
+
+    def write(self, data):
+        view = memoryview(data)
+        while view and not self.done():
+            file = self.files[self.index]
+            end = file["offset"] + file["size"]
+            if self.position < file["offset"]:
+                # Bytes of a file that didn't change
+                skip = min(len(view), file["offset"] - self.position)
+                view = view[skip:]
+                self.position += skip
+                continue
+            if self.handle is None:
+                self._open(file)
+            take = min(len(view), end - self.position)
+            self.handle.write(view[:take])
+            self.sha.update(view[:take])
+            view = view[take:]
+            self.position += take
+            if self.position == end:
+                self._close(file)
+
+    def finish(self):
+        # Zero length files sit at the block's end; anything else left is an error
+        while not self.done() and self.files[self.index]["size"] == 0:
+            self._open(self.files[self.index])
+            self._close(self.files[self.index])
+        if not self.done():
+            raise DeltaUpdateError("Block ended before all files were read")
+
+    def abort(self):
+        if self.handle is not None:
+            self.handle.close()
+        for partial_path, _ in self.written:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def _open(self, file):
+        path = local_path(self.install_dir, file["name"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.handle = open(path + PARTIAL_SUFFIX, "wb")
+        self.sha = hashlib.sha256()
+        self.written.append((path + PARTIAL_SUFFIX, path))
+
+    def _close(self, file):
+        self.handle.close()
+        self.handle = None
+        if self.sha.hexdigest() != file["sha256"]:
+            raise DeltaUpdateError(f"Checksum mismatch for '{file['name']}'")
+        self.index += 1
+
+
+class DeltaUpdate:
+    # Brings an installation to the state of a release manifest by
+    # downloading only the archive blocks that hold changed files. Changed
+    # files are downloaded next to the old ones first and replaced at the
+    # end, so a failed update leaves the old installation as it was.
+    def __init__(
+        self, manifest, archive_url, install_dir, session=None, on_progress=None
+    ):
+        if manifest.get("format") != MANIFEST_FORMAT:
+            raise DeltaUpdateError(
+                f"Unsupported manifest format: {manifest.get('format')}"
+            )
+        self.manifest = manifest
+        self.archive_url = archive_url
+        self.install_dir = install_dir
+        self.session = session or create_session()
+        self.on_progress = on_progress  # called with downloaded byte counts
+        self.changed: list = []
+        self.removed: list = []
+        self.blocks: dict = {}  # block index -> changed files in it
+
+    def plan(self):
+        record = load_install_record(self.install_dir)
+        self.changed = find_changed_files(self.manifest, self.install_dir, record)
+        names = {file["name"] for file in self.manifest["files"]}
+        # Only files an earlier install put there, never app_data or user files
+        self.removed = [name for name in record if name not in names]
+        self.blocks = {}
+        for file in self.changed:
+            if file["block"] is not None:
+                self.blocks.setdefault(file["block"], []).append(file)
+        return self.download_size()
+
+    def download_size(self):
+        return sum(
+            self.manifest["blocks"][index]["packed_size"] for index in self.blocks
+        )
+
+    def archive_size(self):
+        return sum(block["packed_size"] for block in self.manifest["blocks"])
+
+    def worthwhile(self):
+        return self.download_size() <= self.archive_size() * MAX_DELTA_RATIO
+
+    def apply(self):
+        writers = []
+        try:
+            for index, files in sorted(self.blocks.items()):
+                writer = BlockWriter(files, self.install_dir)
+                writers.append(writer)
+                self.fetch_block(self.manifest["blocks"][index], writer)
+            for file in self.changed:
+                if file["block"] is None:
+                    # Empty files are not stored in any block
+                    writer = BlockWriter([file], self.install_dir)
+                    writers.append(writer)
+                    writer.finish()
+        except BaseException:
+            for writer in writers:
+                writer.abort()
+            raise
+
+        self.swap_files([item for writer in writers for item in writer.written])
+        for folder in self.manifest.get("folders", []):
+            os.makedirs(local_path(self.install_dir, folder), exist_ok=True)
+        for name in self.removed:
+            try:
+                os.remove(local_path(self.install_dir, name))
+            except OSError as e:
+                logging.warning(f"Could not remove old file '{name}': {e}")
+        save_install_record(self.install_dir, self.manifest)
+        logging.debug(
+            f"Delta update replaced {len(self.changed)} files, removed {len(self.removed)}"
+        )
+
+    def swap_files(self, written):
+        # Old files are moved aside before the new ones take their place and
+        # are put back if any replace fails, e.g. on an exe or DLL that is
+        # still in use, so the installation is never half old and half new
+        swapped = []  # (path, backup path or None for a new file)
+        try:
+            for partial_path, path in written:
+                backup_path = None
+                if os.path.exists(path):
+                    backup_path = path + BACKUP_SUFFIX
+                    os.replace(path, backup_path)
+                swapped.append((path, backup_path))
+                os.replace(partial_path, path)
+        except BaseException:
+            for path, backup_path in reversed(swapped):
+                try:
+                    if backup_path is not None:
+                        os.replace(backup_path, path)
+                    elif os.path.exists(path):
+                        os.remove(path)
+                except OSError as e:
+                    logging.error(f"Could not restore '{path}': {e}")
+            for partial_path, _ in written:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            raise
+
+        for _, backup_path in swapped:
+            if backup_path is None:
+                continue
+            try:
+                os.remove(backup_path)
+            except OSError as e:
+                logging.warning(f"Could not remove backup '{backup_path}': {e}")
+
+    def fetch_block(self, block, writer):
+        start = block["offset"]
+        end = start + block["packed_size"] - 1
+        response = self.session.get(
+            self.archive_url,
+            headers={"Range": f"bytes={start}-{end}"},
+            stream=True,
+            timeout=REQUEST_TIMEOUT,
+        )
+        with response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise DeltaUpdateError("Server does not support range requests")
+            decompressor = lzma.LZMADecompressor(
+                format=lzma.FORMAT_RAW,
+                filters=[
+                    {"id": lzma.FILTER_LZMA2, "dict_size": self.manifest["dict_size"]}
+                ],
+            )
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                writer.write(decompressor.decompress(chunk))
+                if self.on_progress is not None:
+                    self.on_progress(len(chunk))
+                if writer.done():
+                    break
+        writer.finish()
@@ -0,0 +1,158 @@
+import re
+import logging
+
+
+HEADER_SIZE = 16  # bytes read from a file for the magic byte check
+MAX_HEADER_READS = 16  # per folder
+
+# Headers of save formats that are recognizable no matter the file name
+MAGIC_SIGNATURES = [
+    (b"GVAS", 0.95),  # Unreal Engine SaveGame
+    (b"TESV_SAVEGAME", 0.95),  # Skyrim
+    (b"FO4_SAVEGAME", 0.95),  # Fallout 4
+    (b"FO3SAVEGAME", 0.95),  # Fallout 3 / New Vegas
+    (b"SNFHFZLC", 0.95),  # The Witcher 3
+    (b"BND4", 0.7),  # FromSoftware containers (.sl2 saves, but also game data)
+]
+
+# Only files with these extensions get their header read; executables,
+# images etc. never hold a save
+CONTENT_CHECK_EXTENSIONS = {"", ".dat", ".bin", ".sav", ".save", ".sl2", ".bak"}
+
+# A save-like name only counts with one of these extensions, otherwise
+# "Save.png" or "quicksave.mp4" would make a screenshot folder a hit
+FILENAME_PATTERN_SUFFIX = (
+    r"(\.("
+    + "|".join(
+        sorted(extension[1:] for extension in CONTENT_CHECK_EXTENSIONS if extension)
+    )
+    + r"))?$"
+)
+
+DEFAULT_FILENAME_PATTERNS = [
+    r"^(auto|quick)?save(game|data|file|slot)?s?[ _-]?\d*" + FILENAME_PATTERN_SUFFIX,
+    r"^(slot|savegame|gamesave|profile)[ _-]?\d+" + FILENAME_PATTERN_SUFFIX,
+]
+
+
+def get_extension(name):
+    dot = name.rfind(".")
+    return name[dot:].lower() if dot != -1 else ""
+
+
+def combine_confidence(detections):
+    # detections: detector name -> confidence; independent evidence adds up
+    remaining = 1.0
+    for confidence in detections.values():
+        remaining *= 1.0 - confidence
+    return 1.0 - remaining
+
+
+class ExtensionMatcher:
+    # Plain extensions (".sav") are matched with one set lookup on the text
+    # after the last dot; anything else (".sav.bak", "save") falls back to endswith
+    def __init__(self, extensions):
+        self.suffixes: set = set()
+        other = []
+        for extension in extensions:
+            extension = extension.lower()
+            if extension.startswith(".") and extension.count(".") == 1:
+                self.suffixes.add(extension)
+            else:
+                other.append(extension)
+        self.other = tuple(other)
+
+    def count(self, extension_counts):
+        # Only covers the plain extensions, the others need the file names
+        return sum(extension_counts.get(suffix, 0) for suffix in self.suffixes)
+
+
+class ExtensionDetector:
+    # The user's "File extensions to search" setting
+    name = "extension"
+
+    def __init__(self, extensions, confidence=0.8):
+        self.matcher = ExtensionMatcher(extensions)
+        self.confidence = confidence
+
+    def check_name(self, name, extension):
+        if extension in self.matcher.suffixes:
+            return True
+        return bool(self.matcher.other) and name.lower().endswith(self.matcher.other)
+
+
+class FilenamePatternDetector:
+    name = "filename"
+
+    def __init__(self, patterns=DEFAULT_FILENAME_PATTERNS, confidence=0.6):
+        self.pattern = re.compile("|".join(f"(?:{p})" for p in patterns), re.I)
+        self.confidence = confidence
+
+    def check_name(self, name, extension):
+        return self.pattern.match(name) is not None
+
+
+class MagicBytesDetector:
+    name = "magic"
+
+    def __init__(self, signatures=MAGIC_SIGNATURES):
+        self.signatures = signatures
+
+    def check_header(self, header):
+        return max(
+            (
+                confidence
+                for signature, confidence in self.signatures
+                if header.startswith(signature)
+            ),
+            default=0.0,
+        )
+
+
+class DetectorPipeline:
+    # Runs the detectors over one folder's files, cheapest first: name checks
+    # for every file, then header reads for a few candidate files, skipped
+    # entirely when the names already make the folder a near-certain hit.
+    # Returns detector name -> confidence for the folder.
+    def __init__(self, extensions, certain=0.9):
+        self.extension_detector = ExtensionDetector(extensions)
+        self.name_detectors = [self.extension_detector, FilenamePatternDetector()]
+        self.magic_detector = MagicBytesDetector()
+        self.certain = certain
+
+    def detect(self, files):
+        # files: list of (name, path, extension) in one folder
+        detections: dict = {}
+        candidates = []
+        for name, path, extension in files:
+            for detector in self.name_detectors:
+                if detector.name not in detections and detector.check_name(
+                    name, extension
+                ):
+                    detections[detector.name] = detector.confidence
+            if extension in CONTENT_CHECK_EXTENSIONS:
+                candidates.append(path)
+
+        if combine_confidence(detections) < self.certain:
+            confidence = self.read_headers(candidates[:MAX_HEADER_READS])
+            if confidence:
+                detections[self.magic_detector.name] = confidence
+        return detections
+
+    def read_headers(self, paths):
+        best = 0.0
+        for path in paths:
+            try:
+                with open(path, "rb", buffering=0) as f:
+                    header = f.read(HEADER_SIZE)
+            except OSError as e:
+                logging.debug(f"Could not read header of '{path}': {e}")
+                continue
+            best = max(best, self.magic_detector.check_header(header))
+        return best
+
+    def extension_detection(self, extension_counts):
+        # The extension detector answered from an index's extension counts
+        if self.extension_detector.matcher.count(extension_counts):
+            return {self.extension_detector.name: self.extension_detector.confidence}
+        return {}
@@ -0,0 +1,332 @@
+import os
+import json
+import time
+import logging
+import threading
+import concurrent.futures
+from savemanager.lazy_import import lazy_import
+
+# SaveManager imports this module at startup, requests is loaded on first use
+requests = lazy_import("requests")
+
+
+LATEST_RELEASE_URL = (
+    "https://api.github.com/repos/FlamingWater35/SaveManager/releases/latest"
+)
+# Kept in app_data, which the installer never removes, so SaveManager and the
+# installer share one copy of the release information
+RELEASE_CACHE_NAME = "release_cache.json"
+REQUEST_TIMEOUT = 30  # seconds to connect or wait for the next bytes
+SEGMENT_COUNT = 4  # parallel Range requests, also the connection pool size
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+SEGMENT_RETRIES = 3  # reconnects per segment, each continues where it stopped
+STATE_SAVE_INTERVAL = 1.0  # seconds between writes of the resume state
+PARTIAL_SUFFIX = ".partial"
+STATE_SUFFIX = ".partial.json"
+
+
+class DownloadError(Exception):
+    pass
+
+
+def create_session(pool_size=SEGMENT_COUNT):
+    # One connection pool for the API, the manifest and all segments
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def write_json_atomic(path, data):
+    # SaveManager and the installer may write at the same time; readers see
+    # either the old or the new file, never half of one
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+class ReleaseCache:
+    # The latest release JSON from the GitHub API, stored with its ETag.
+    # Later checks send If-None-Match and reuse the stored copy when GitHub
+    # answers 304, which also doesn't count against the API rate limit.
+    def __init__(self, path, url=LATEST_RELEASE_URL, session=None):
+        self.path = path
+        self.url = url
+        self.session = session or create_session(pool_size=1)
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != self.url or "data" not in entry:
+            return None
+        return entry
+
+    def fetch(self):
+        entry = self.load()
+        headers = {}
+        if entry is not None and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        response = self.session.get(self.url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and entry is not None:
+            logging.debug("Release information not modified, using the cached copy")
+            return entry["data"]
+        response.raise_for_status()
+        data = response.json()
+
+        entry = {"url": self.url, "etag": response.headers.get("ETag"), "data": data}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_json_atomic(self.path, entry)
+        except OSError as e:
+            logging.warning(f"Could not save release cache: {e}")
+        return data
+
+
+class SegmentedDownload:
+    # Downloads url to path with several Range requests at once over one
+    # pooled session. Bytes go to path.partial and the finished length of
+    # every segment to path.partial.json, so an interrupted download later
+    # continues where each segment stopped instead of at byte zero. A server
+    # without Range support gets one plain request.
+    def __init__(
+        self,
+        url,
+        path,
+        size=0,
+        session=None,
+        segments=SEGMENT_COUNT,
+        on_progress=None,
+    ):
+        self.url = url
+        self.path = path
+        self.partial_path = path + PARTIAL_SUFFIX
+        self.state_path = path + STATE_SUFFIX
+        self.size = size  # expected size, 0 if unknown
+        self.segments = max(1, segments)
+        self.session = session or create_session(self.segments)
+        # Called with downloaded byte counts, negative when a restart drops bytes
+        self.on_progress = on_progress
+        self.state: dict = {}
+        self.state_lock = threading.Lock()
+        self.state_saved = 0.0
+        self.stale = False  # the server's file changed since the download started
+        # Set when one segment fails so the others stop writing
+        self.cancelled = threading.Event()
+
+    def run(self):
+        state = self.load_state()
+        if state is None:
+            state = self.probe()
+        else:
+            logging.debug(
+                f"Resuming download of {self.url} at {self.downloaded(state)} bytes"
+            )
+        self.state = state
+        if self.on_progress is not None:
+            self.on_progress(self.downloaded(state))
+
+        if not state["ranges"]:
+            self.fetch_whole()
+        else:
+            pending = [
+                index
+                for index, (start, end, done) in enumerate(state["segments"])
+                if start + done <= end
+            ]
+            if pending and not self.fetch_segments(pending):
+                # The file on the server was replaced since the partial
+                # download started, so its bytes are of no use: start over
+                logging.info(f"{self.url} changed on the server, restarting download")
+                if self.on_progress is not None:
+                    self.on_progress(-self.downloaded(self.state))
+                self.stale = False
+                self.cancelled.clear()
+                self.state = self.probe()
+                if not self.state["ranges"]:
+                    self.fetch_whole()
+                elif not self.fetch_segments(range(len(self.state["segments"]))):
+                    raise DownloadError(
+                        "The file changed on the server during the download"
+                    )
+
+        os.replace(self.partial_path, self.path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return self.path
+
+    def fetch_segments(self, pending):
+        # False if the server's file changed, the partial download is discarded
+        error = None
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(pending), thread_name_prefix="download"
+        ) as executor:
+            futures = [executor.submit(self.fetch_segment, index) for index in pending]
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                except BaseException as e:
+                    self.cancelled.set()
+                    if error is None:
+                        error = e
+        # Every segment thread has stopped and closed the partial file here
+        self.save_state(force=True)
+        if error is not None:
+            raise error
+        if self.stale:
+            self.discard()
+            return False
+        return True
+
+    def discard(self):
+        # Drop a finished or partial download, e.g. after a checksum mismatch
+        for path in (self.path, self.partial_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def downloaded(self, state):
+        return sum(done for _, _, done in state["segments"])
+
+    def load_state(self):
+        # The saved state if it belongs to this download, else None
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            partial_size = os.path.getsize(self.partial_path)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != self.url or not state.get("ranges"):
+            return None
+        if self.size and state["size"] != self.size:
+            return None
+        if partial_size != state["size"]:
+            return None
+        return state
+
+    def probe(self):
+        # A one byte Range request tells whether the server can resume and
+        # the real size; the ETag lets later requests check with If-Range
+        # that the file didn't change in between
+        response = self.session.get(
+            self.url,
+            headers={"Range": "bytes=0-0"},
+            stream=True,
+            timeout=REQUEST_TIMEOUT,
+        )
+        with response:
+            response.raise_for_status()
+            content_range = response.headers.get("Content-Range", "")
+            total = content_range.rsplit("/", 1)[-1]
+            if response.status_code != 206 or not total.isdigit():
+                logging.debug(f"No Range support for {self.url}, downloading in one go")
+                return {
+                    "url": self.url,
+                    "size": self.size,
+                    "ranges": False,
+                    "segments": [[0, self.size - 1, 0]],
+                }
+            self.size = int(total)
+            etag = response.headers.get("ETag")
+
+        count = max(1, min(self.segments, self.size // MIN_SEGMENT_SIZE))
+        step = -(-self.size // count)
+        segments = [
+            [start, min(start + step, self.size) - 1, 0]
+            for start in range(0, self.size, step)
+        ]
+        with open(self.partial_path, "wb") as f:
+            f.truncate(self.size)
+        state = {
+            "url": self.url,
+            "size": self.size,
+            "etag": etag,
+            "ranges": True,
+            "segments": segments,
+        }
+        self.state = state
+        self.save_state(force=True)
+        return state
+
+    def save_state(self, force=False):
+        with self.state_lock:
+            now = time.monotonic()
+            if not force and now - self.state_saved < STATE_SAVE_INTERVAL:
+                return
+            self.state_saved = now
+            try:
+                write_json_atomic(self.state_path, self.state)
+            except OSError as e:
+                logging.warning(f"Could not save download state: {e}")
+
+    def fetch_segment(self, index):
+        segment = self.state["segments"][index]
+        for attempt in range(SEGMENT_RETRIES + 1):
+            try:
+                self.stream_range(segment)
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                if attempt == SEGMENT_RETRIES:
+                    raise
+                logging.warning(
+                    f"Download segment {index} interrupted ({e}), reconnecting"
+                )
+            if segment[0] + segment[2] > segment[1] or self.cancelled.is_set():
+                return
+        raise DownloadError(f"Download segment {index} ended early")
+
+    def stream_range(self, segment):
+        start, end, done = segment
+        headers = {"Range": f"bytes={start + done}-{end}"}
+        if self.state.get("etag"):
+            headers["If-Range"] = self.state["etag"]
+        response = self.session.get(
+            self.url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT
+        )
+        with response, open(self.partial_path, "r+b", buffering=0) as f:
+            response.raise_for_status()
+            if response.status_code != 206:
+                # If-Range failed: the file on the server is not the one the
+                # partial download started from
+                self.stale = True
+                self.cancelled.set()
+                return
+            f.seek(start + done)
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if self.cancelled.is_set():
+                    return
+                chunk = chunk[: end + 1 - (start + segment[2])]
+                view = memoryview(chunk)
+                while view:
+                    view = view[f.write(view) :]
+                # Only counted as done once the bytes are written
+                segment[2] += len(chunk)
+                if self.on_progress is not None:
+                    self.on_progress(len(chunk))
+                self.save_state()
+                if segment[0] + segment[2] > segment[1]:
+                    break
+
+    def fetch_whole(self):
+        segment = self.state["segments"][0]
+        response = self.session.get(self.url, stream=True, timeout=REQUEST_TIMEOUT)
+        with response, open(self.partial_path, "wb", buffering=0) as f:
+            response.raise_for_status()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                view = memoryview(chunk)
+                while view:
+                    view = view[f.write(view) :]
+                segment[2] += len(chunk)
+                if self.on_progress is not None:
+                    self.on_progress(len(chunk))
+        if self.size and segment[2] != self.size:
+            raise DownloadError(
+                f"Download ended after {segment[2]} of {self.size} bytes"
+            )
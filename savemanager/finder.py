@@ -0,0 +1,217 @@
+import os
+import random
+import logging
+import threading
+import collections
+from typing import NamedTuple
+from savemanager.detectors import DetectorPipeline, combine_confidence, get_extension
+
+
+DEFAULT_FINDER_WORKERS = 8
+
+
+class KnownFolder(NamedTuple):
+    # What the finder index remembers about a folder from the last search
+    mtime_ns: int  # None if it could not be read, so it is always retried
+    subdirs: list
+    extensions: dict  # lower case extension (".sav", "" for none) -> file count
+    detections: dict  # detector name -> confidence, except the extension detector
+
+
+class FolderRecord(NamedTuple):
+    path: str
+    mtime_ns: int
+    extensions: dict
+    detections: dict
+
+
+def is_junction(entry):
+    # Windows junctions look like plain folders to is_dir(follow_symlinks=False)
+    return hasattr(entry, "is_junction") and entry.is_junction()
+
+
+class FileCrawler:
+    # Finds folders that look like they hold saves in a single pass. Every worker has its
+    # own deque: it pushes the subfolders it finds and pops from the same end
+    # (depth first), and when it runs dry it steals from the other end of
+    # another worker's deque, which holds the oldest and usually biggest folders.
+    #
+    # Progress is estimated without counting folders first: each root gets an
+    # equal share of 1.0, and a folder with n subfolders completes 1/(n+1) of
+    # its share and hands the rest to its subfolders.
+    #
+    # With known folders from the finder index, a folder whose mtime did not
+    # change is not listed again: its subfolders and extension counts come from
+    # the index and only the subfolders are visited (one stat each).
+    def __init__(
+        self,
+        roots,
+        extensions,
+        on_match=None,
+        cancel_flag=None,
+        workers=DEFAULT_FINDER_WORKERS,
+        known=None,
+        exclude=None,
+    ):
+        self.pipeline = DetectorPipeline(extensions)
+        # called from the workers as on_match(folder, confidence)
+        self.on_match = on_match
+        self.cancel_flag = cancel_flag if cancel_flag is not None else threading.Event()
+        self.worker_count = max(1, workers)
+        # Extensions that aren't plain suffixes need a fresh listing every time
+        if known is None or self.pipeline.extension_detector.matcher.other:
+            known = {}
+        self.known = known
+        # Folders that are not descended into, e.g. already known save locations
+        self.exclude = exclude or set()
+
+        self.matches: dict = {}  # folder -> confidence (0-1)
+        self.errors: list = []  # (folder, OSError) for unreadable folders
+        self.visited: set = set()
+        self.subdirs: dict = {}  # visited folder -> subfolders queued for a scan
+        self.changed: list = []  # FolderRecord for every folder listed again
+        self._queues = [collections.deque() for _ in range(self.worker_count)]
+        self._progress = [0.0] * self.worker_count
+        self._scanned = [0] * self.worker_count
+        self._lock = threading.Lock()
+        self._work_available = threading.Condition(self._lock)
+        self._idle = 0
+        self._pending = len(roots)  # queued or running folders
+        for index, root in enumerate(roots):
+            # Normalized so subfolder paths always have the root as their dirname
+            self._queues[index % self.worker_count].append(
+                (os.path.normpath(root), 1 / len(roots))
+            )
+
+    def progress(self):
+        return min(1.0, sum(self._progress))
+
+    def scanned_folders(self):
+        return sum(self._scanned)
+
+    def unfinished(self):
+        # Visited folders with a subfolder somewhere below that was never
+        # scanned, which happens when the crawl is cancelled. Children have
+        # longer paths, so they are decided before their parents.
+        unfinished: set = set()
+        for path in sorted(self.subdirs, key=len, reverse=True):
+            if any(
+                subdir not in self.visited or subdir in unfinished
+                for subdir in self.subdirs[path]
+            ):
+                unfinished.add(path)
+        return unfinished
+
+    def run(self):
+        threads = [
+            threading.Thread(
+                target=self._worker, args=(index,), name=f"finder_{index}", daemon=True
+            )
+            for index in range(self.worker_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.matches
+
+    def _next_item(self, index):
+        own = self._queues[index]
+        while not self.cancel_flag.is_set():
+            try:
+                return own.pop()
+            except IndexError:
+                pass
+            start = random.randrange(self.worker_count)
+            for offset in range(self.worker_count):
+                victim = self._queues[(start + offset) % self.worker_count]
+                try:
+                    return victim.popleft()
+                except IndexError:
+                    pass
+            with self._lock:
+                if self._pending == 0:
+                    return None
+                self._idle += 1
+                self._work_available.wait(0.05)
+                self._idle -= 1
+        return None
+
+    def _worker(self, index):
+        while (item := self._next_item(index)) is not None:
+            try:
+                self._scan(index, *item)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    if self._pending == 0:
+                        self._work_available.notify_all()
+
+    def _list_folder(self, path):
+        # Returns (subdirs, extension counts, detections)
+        subdirs = []
+        files = []
+        extensions: dict = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not is_junction(entry):
+                            subdirs.append(entry.path)
+                        continue
+                    # Pipes and devices would block the header reads
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                extension = get_extension(entry.name)
+                extensions[extension] = extensions.get(extension, 0) + 1
+                files.append((entry.name, entry.path, extension))
+        return subdirs, extensions, self.pipeline.detect(files)
+
+    def _scan(self, index, path, share):
+        subdirs = []
+        detections: dict = {}
+        self.visited.add(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            known = self.known.get(path)
+            if known is not None and known.mtime_ns == mtime_ns:
+                subdirs = known.subdirs
+                detections = {
+                    **self.pipeline.extension_detection(known.extensions),
+                    **known.detections,
+                }
+            else:
+                subdirs, extensions, detections = self._list_folder(path)
+                # The extension result depends on the settings, so it isn't stored
+                stored = {
+                    name: confidence
+                    for name, confidence in detections.items()
+                    if name != self.pipeline.extension_detector.name
+                }
+                self.changed.append(FolderRecord(path, mtime_ns, extensions, stored))
+        except OSError as e:
+            logging.debug(f"File search could not read '{path}': {e}")
+            self.errors.append((path, e))
+            self.changed.append(FolderRecord(path, None, {}, {}))
+
+        if detections:
+            confidence = combine_confidence(detections)
+            self.matches[path] = confidence
+            if self.on_match is not None:
+                self.on_match(path, confidence)
+
+        if self.exclude:
+            subdirs = [subdir for subdir in subdirs if subdir not in self.exclude]
+        self.subdirs[path] = subdirs
+        child_share = share / (len(subdirs) + 1)
+        if subdirs:
+            # Counted before they are queued so no worker sees 0 pending too early
+            with self._lock:
+                self._pending += len(subdirs)
+                if self._idle:
+                    self._work_available.notify_all()
+            self._queues[index].extend((subdir, child_share) for subdir in subdirs)
+        self._progress[index] += child_share
+        self._scanned[index] += 1
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import logging
+from savemanager.finder import KnownFolder
+from savemanager.detectors import DetectorPipeline, combine_confidence
+
+
+FINDER_INDEX_FILE_NAME = "finder_index.sqlite3"
+SCHEMA_VERSION = 2  # bump when the tables or the detectors change
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS extensions (
+    folder TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (folder, extension)
+);
+CREATE INDEX IF NOT EXISTS extensions_extension ON extensions (extension);
+CREATE TABLE IF NOT EXISTS detections (
+    folder TEXT NOT NULL,
+    detector TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    PRIMARY KEY (folder, detector)
+);
+"""
+
+
+def is_under(path, root):
+    root = root.rstrip("\\/")
+    return path == root or path.startswith((root + "\\", root + "/"))
+
+
+class FinderIndex:
+    # Every folder the finder has listed, with its mtime and how many files of
+    # each extension it holds. Answers extension queries without touching the
+    # disk and lets the crawler skip listing folders whose mtime is unchanged.
+    # Only use an instance from the thread that created it (sqlite3 rule).
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # It's only a cache, start over instead of migrating
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS folders; DROP TABLE IF EXISTS extensions; DROP TABLE IF EXISTS detections;"
+            )
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def covers(self, roots):
+        # True if every root was indexed by an earlier search
+        return all(
+            self.connection.execute(
+                "SELECT 1 FROM folders WHERE path = ? AND mtime_ns IS NOT NULL",
+                (root,),
+            ).fetchone()
+            for root in roots
+        )
+
+    def query(self, roots, extensions):
+        # folder -> confidence from the index alone; None if the extensions
+        # can't be answered from extension counts
+        extension_detector = DetectorPipeline(extensions).extension_detector
+        if extension_detector.matcher.other:
+            return None
+        detections: dict = {}
+        suffixes = tuple(extension_detector.matcher.suffixes)
+        placeholders = ", ".join("?" * len(suffixes))
+        for (folder,) in self.connection.execute(
+            f"SELECT DISTINCT folder FROM extensions WHERE extension IN ({placeholders})",
+            suffixes,
+        ):
+            detections[folder] = {extension_detector.name: extension_detector.confidence}
+        for folder, detector, confidence in self.connection.execute(
+            "SELECT folder, detector, confidence FROM detections"
+        ):
+            detections.setdefault(folder, {})[detector] = confidence
+        return {
+            folder: combine_confidence(folder_detections)
+            for folder, folder_detections in detections.items()
+            if any(is_under(folder, root) for root in roots)
+        }
+
+    def load_known(self, roots):
+        # path -> KnownFolder for the folders under roots
+        known: dict = {}
+        for path, mtime_ns in self.connection.execute(
+            "SELECT path, mtime_ns FROM folders"
+        ):
+            if any(is_under(path, root) for root in roots):
+                known[path] = KnownFolder(mtime_ns, [], {}, {})
+        for path, known_folder in known.items():
+            parent = known.get(os.path.dirname(path))
+            if parent is not None and parent is not known_folder:
+                parent.subdirs.append(path)
+        for folder, extension, count in self.connection.execute(
+            "SELECT folder, extension, count FROM extensions"
+        ):
+            if folder in known:
+                known[folder].extensions[extension] = count
+        for folder, detector, confidence in self.connection.execute(
+            "SELECT folder, detector, confidence FROM detections"
+        ):
+            if folder in known:
+                known[folder].detections[detector] = confidence
+        return known
+
+    def update(self, crawler, known, completed):
+        # Writes the folders the crawler listed again; known folders that were
+        # not visited are gone and are removed, but only after a full crawl.
+        # After a cancelled crawl, folders with subfolders that were never
+        # scanned get no mtime, so the next search lists them again instead of
+        # taking their incomplete subfolder list from the index.
+        with self.connection:
+            for record in crawler.changed:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO folders (path, mtime_ns) VALUES (?, ?)",
+                    (record.path, record.mtime_ns),
+                )
+                self.connection.execute(
+                    "DELETE FROM extensions WHERE folder = ?", (record.path,)
+                )
+                self.connection.executemany(
+                    "INSERT INTO extensions (folder, extension, count) VALUES (?, ?, ?)",
+                    [
+                        (record.path, extension, count)
+                        for extension, count in record.extensions.items()
+                    ],
+                )
+                self.connection.execute(
+                    "DELETE FROM detections WHERE folder = ?", (record.path,)
+                )
+                self.connection.executemany(
+                    "INSERT INTO detections (folder, detector, confidence) VALUES (?, ?, ?)",
+                    [
+                        (record.path, detector, confidence)
+                        for detector, confidence in record.detections.items()
+                    ],
+                )
+            if not completed:
+                self.connection.executemany(
+                    "UPDATE folders SET mtime_ns = NULL WHERE path = ?",
+                    [(path,) for path in crawler.unfinished()],
+                )
+            else:
+                removed = [(path,) for path in known if path not in crawler.visited]
+                self.connection.executemany("DELETE FROM folders WHERE path = ?", removed)
+                self.connection.executemany(
+                    "DELETE FROM extensions WHERE folder = ?", removed
+                )
+                self.connection.executemany(
+                    "DELETE FROM detections WHERE folder = ?", removed
+                )
+        logging.debug(f"Finder index updated with {len(crawler.changed)} folders")
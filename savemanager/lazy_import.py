@@ -0,0 +1,57 @@
+import json
+import time
+import logging
+import importlib
+import threading
+
+
+import_timings: dict = {}  # module name -> seconds spent importing it
+_import_lock = threading.Lock()
+
+
+class LazyModule:
+    # Stands in for a module and imports it on first attribute access.
+    # Nuitka can't see these imports, so list them with --include-module.
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _import_lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    import_timings[self._name] = time.perf_counter() - start
+                    logging.debug(
+                        f"Imported {self._name} on first use in {import_timings[self._name] * 1000:.1f} ms"
+                    )
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def save_import_timings(path, **extra):
+    # Appends one JSON line per session so startup time can be compared over time
+    record = {
+        "time": time.time(),
+        **extra,
+        "imports": {
+            name: round(seconds, 4) for name, seconds in import_timings.items()
+        },
+    }
+    try:
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logging.error(f"Saving import timings failed: {e}")
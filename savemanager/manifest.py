@@ -0,0 +1,92 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+
+
+def hash_file(path):
+    file_hash = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_manifest_path(manifest_dir, source, dest):
+    pair_key = hashlib.sha1(f"{source}|{dest}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(manifest_dir, f"{pair_key}.json")
+
+
+class Manifest:
+    # Remembers size, mtime_ns and (optionally) hash of every file copied for
+    # one folder pair, keyed by the path relative to the source folder
+    def __init__(self, path, source, dest):
+        self.path = path
+        self.source = source
+        self.dest = dest
+        self.files: dict = {}
+        self._seen: set = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_folder_pair(cls, manifest_dir, source, dest):
+        manifest = cls(get_manifest_path(manifest_dir, source, dest), source, dest)
+        manifest.load()
+        return manifest
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if (
+                data.get("source") == self.source
+                and data.get("destination") == self.dest
+            ):
+                self.files = data["files"]
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable manifest '{self.path}': {e}")
+            self.files = {}
+
+    def is_unchanged(self, rel_path, size, mtime_ns):
+        with self._lock:
+            entry = self.files.get(rel_path)
+        return entry is not None and entry[0] == size and entry[1] == mtime_ns
+
+    def hash_matches(self, rel_path, file_hash):
+        with self._lock:
+            entry = self.files.get(rel_path)
+        return entry is not None and entry[2] is not None and entry[2] == file_hash
+
+    def keep(self, rel_path):
+        with self._lock:
+            self._seen.add(rel_path)
+
+    def record(self, rel_path, size, mtime_ns, file_hash=None):
+        with self._lock:
+            self.files[rel_path] = [size, mtime_ns, file_hash]
+            self._seen.add(rel_path)
+
+    def save(self, prune=False):
+        # prune drops files not seen in this run (deleted from the source);
+        # only safe after a run that walked the whole tree
+        with self._lock:
+            if prune:
+                self.files = {
+                    rel_path: entry
+                    for rel_path, entry in self.files.items()
+                    if rel_path in self._seen
+                }
+            data = {
+                "source": self.source,
+                "destination": self.dest,
+                "files": self.files,
+            }
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        logging.debug(f"Saved manifest with {len(self.files)} files: {self.path}")
@@ -0,0 +1,163 @@
+import os
+import re
+
+
+# Paths are compared with os.path.normcase, so case-insensitively on Windows
+CASE_INSENSITIVE = os.path.normcase("A") == "a"
+
+
+def normalize_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def split_path(path):
+    # "C:\\Games\\Saves" -> ["c:", "games", "saves"] (after normalize_path)
+    return [part for part in re.split(r"[\\/]+", path) if part]
+
+
+class PrefixTree:
+    # Folders stored as a tree of path components; a lookup walks the
+    # components of one path, so it costs O(path depth) no matter how many
+    # folders are stored
+    def __init__(self, paths=()):
+        self.root: dict = {}
+        for path in paths:
+            self.add(path)
+
+    def add(self, path):
+        node = self.root
+        for part in split_path(normalize_path(path)):
+            node = node.setdefault(part, {})
+        node[None] = True  # end of a stored folder
+
+    def contains(self, path):
+        # True if path is a stored folder or inside one
+        node = self.root
+        for part in split_path(normalize_path(path)):
+            node = node.get(part)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
+
+
+def translate_pattern(pattern):
+    # gitignore glob -> regex on "/" separated relative paths
+    parts = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[" and "]" in pattern[index + 2 :]:
+            end = pattern.index("]", index + 2)
+            content = pattern[index + 1 : end]
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            parts.append(f"[{content.replace(chr(92), chr(92) * 2)}]")
+            index = end
+        elif char == "\\" and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return "".join(parts)
+
+
+class ExcludeRule:
+    # One line of a gitignore style pattern list:
+    #   "*.log"      any file or folder named like that, at any depth
+    #   "cache/"     folders only
+    #   "/Backups"   anchored to the source folder, like any pattern with a "/"
+    #                that isn't the trailing one ("saves/*.bak")
+    #   "**/tmp"     "**" matches any number of folders
+    #   "!keep.log"  include again what an earlier line excluded
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        regex = translate_pattern(pattern.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        self.regex = re.compile(regex, re.I if CASE_INSENSITIVE else 0)
+
+    def matches(self, rel_path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.fullmatch(rel_path) is not None
+
+
+def compile_exclude_patterns(patterns):
+    rules = []
+    for pattern in patterns:
+        pattern = pattern.strip()
+        if pattern and not pattern.startswith("#"):
+            rules.append(ExcludeRule(pattern))
+    return rules
+
+
+class PathFilter:
+    # Compiled form of the "Ignored folders" and "Skip hidden files" settings
+    # plus a folder pair's exclude patterns. Build it once per folder pair and
+    # ask it about every folder and file the scanner finds. Both checks return
+    # None to keep the entry or the reason to leave it out: "ignored"
+    # (ignored folder setting), "hidden" or "excluded" (exclude pattern).
+    def __init__(self, ignored_folders=(), skip_hidden=False, exclude=()):
+        if isinstance(ignored_folders, PrefixTree):
+            self.ignored = ignored_folders
+        else:
+            self.ignored = PrefixTree(ignored_folders)
+        self.skip_hidden = skip_hidden
+        self.rules = compile_exclude_patterns(exclude)
+
+    @classmethod
+    def from_settings(cls, settings, exclude=()):
+        return cls(settings["ignored_folders"], settings["skip_hidden_files"], exclude)
+
+    def with_exclude(self, exclude):
+        # Same settings, other folder pair; the ignored folder tree is shared
+        return PathFilter(self.ignored, self.skip_hidden, exclude)
+
+    def prune_dir(self, path, rel_path, name):
+        # rel_path is relative to the source folder, "." for the source itself
+        if self.ignored.root and self.ignored.contains(path):
+            return "ignored"
+        if self.skip_hidden and name.startswith("."):
+            return "hidden"
+        if rel_path != "." and self.is_excluded(rel_path, True):
+            return "excluded"
+        return None
+
+    def skip_file(self, rel_path, name):
+        if self.skip_hidden and name.startswith("."):
+            return "hidden"
+        if self.is_excluded(rel_path, False):
+            return "excluded"
+        return None
+
+    def is_excluded(self, rel_path, is_dir):
+        if not self.rules:
+            return False
+        if os.sep != "/":
+            rel_path = rel_path.replace(os.sep, "/")
+        # Like gitignore, the last matching line decides
+        for rule in reversed(self.rules):
+            if rule.matches(rel_path, is_dir):
+                return not rule.negate
+        return False
@@ -0,0 +1,169 @@
+import math
+import time
+import threading
+from typing import NamedTuple
+
+
+class ProgressSample(NamedTuple):
+    copied_bytes: int
+    total_bytes: int
+    done_files: int  # copied or skipped
+    total_files: int
+    current_file: str
+
+
+class CopyStats(NamedTuple):
+    copied_bytes: int
+    total_bytes: int
+    done_files: int
+    total_files: int
+    current_file: str
+    elapsed: float
+    bytes_per_second: float
+    files_per_second: float
+    eta_seconds: float  # None until there is enough data
+
+
+class ThroughputEstimator:
+    # Moving-window copy speed and ETA from progress samples. Rates are
+    # exponentially weighted so they follow changes (small files -> large
+    # files, SSD -> HDD) within a few time constants. For the ETA each
+    # interval is modelled as  seconds = bytes * byte_cost + files * file_cost
+    # and both costs are fitted with exponentially weighted least squares, so
+    # trees with many small files get their per-file overhead accounted for
+    def __init__(self, time_constant=5.0, min_interval=0.25):
+        self.time_constant = time_constant
+        self.min_interval = min_interval
+        self.start_time = None
+        self.bytes_per_second = 0.0
+        self.files_per_second = 0.0
+        self._last = None  # (time, copied bytes, done files)
+        # Weighted sums for the least squares fit (b = bytes, f = files, t = time)
+        self._sums = [0.0] * 5  # bb, bf, ff, bt, ft
+
+    def update(self, copied_bytes, done_files, now=None):
+        now = time.monotonic() if now is None else now
+        if self._last is None:
+            self.start_time = now
+            self._last = (now, copied_bytes, done_files)
+            return
+        last_time, last_bytes, last_files = self._last
+        interval = now - last_time
+        if interval < self.min_interval:
+            return
+        self._last = (now, copied_bytes, done_files)
+
+        delta_bytes = copied_bytes - last_bytes
+        delta_files = done_files - last_files
+        decay = math.exp(-interval / self.time_constant)
+        self.bytes_per_second = decay * self.bytes_per_second + (1 - decay) * (
+            delta_bytes / interval
+        )
+        self.files_per_second = decay * self.files_per_second + (1 - decay) * (
+            delta_files / interval
+        )
+
+        sums = self._sums
+        for index, value in enumerate(
+            (
+                delta_bytes * delta_bytes,
+                delta_bytes * delta_files,
+                delta_files * delta_files,
+                delta_bytes * interval,
+                delta_files * interval,
+            )
+        ):
+            sums[index] = decay * sums[index] + value
+
+    def costs(self):
+        # (seconds per byte, seconds per file), None without usable data
+        bb, bf, ff, bt, ft = self._sums
+        determinant = bb * ff - bf * bf
+        if determinant > 1e-9 * bb * ff:
+            byte_cost = (bt * ff - ft * bf) / determinant
+            file_cost = (ft * bb - bt * bf) / determinant
+            if byte_cost >= 0 and file_cost >= 0:
+                return byte_cost, file_cost
+        # Intervals too alike to separate the two costs (or a negative fit):
+        # put everything on whichever one has data
+        if bb > 0 and bt > 0:
+            return bt / bb, 0.0
+        if ff > 0 and ft > 0:
+            return 0.0, ft / ff
+        return None
+
+    def eta(self, remaining_bytes, remaining_files):
+        costs = self.costs()
+        if costs is None:
+            return None
+        return max(0.0, remaining_bytes * costs[0] + remaining_files * costs[1])
+
+
+class ProgressCounters:
+    # Progress shared between the copy workers and whoever displays it.
+    # Every worker thread gets its own slot and is the only thread writing to
+    # it, so updates need no lock; readers sum the slots whenever they want a
+    # sample (once per frame in the GUI) instead of receiving an event per chunk
+    def __init__(self):
+        self.start(0, 0)
+
+    def start(self, total_bytes, total_files):
+        self.estimator = ThroughputEstimator()
+        self.estimator.update(0, 0)
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._slots: list = []
+        self.total_bytes = total_bytes
+        self.total_files = total_files
+        self.current_file = ""
+
+    def _slot(self):
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            # [copied bytes, done files, bytes removed from the total]
+            slot = [0, 0, 0]
+            self._local.slot = slot
+            self._slots.append(slot)
+        return slot
+
+    def add_bytes(self, byte_count):
+        self._slot()[0] += byte_count
+
+    def remove_from_total(self, byte_count):
+        # Skipped files (or the unfinished part of a cancelled one) are taken
+        # out of the total so the percentage still ends at 100
+        self._slot()[2] += byte_count
+
+    def set_current_file(self, path):
+        self.current_file = path
+
+    def file_done(self):
+        self._slot()[1] += 1
+
+    def sample(self):
+        slots = list(self._slots)
+        return ProgressSample(
+            sum(slot[0] for slot in slots),
+            self.total_bytes - sum(slot[2] for slot in slots),
+            sum(slot[1] for slot in slots),
+            self.total_files,
+            self.current_file,
+        )
+
+    def stats(self):
+        # Sample plus speed/ETA; cheap enough to call every frame
+        sample = self.sample()
+        with self._stats_lock:
+            estimator = self.estimator
+            estimator.update(sample.copied_bytes, sample.done_files)
+            eta_seconds = estimator.eta(
+                max(0, sample.total_bytes - sample.copied_bytes),
+                max(0, sample.total_files - sample.done_files),
+            )
+        return CopyStats(
+            *sample,
+            elapsed=time.monotonic() - estimator.start_time,
+            bytes_per_second=estimator.bytes_per_second,
+            files_per_second=estimator.files_per_second,
+            eta_seconds=eta_seconds,
+        )
@@ -0,0 +1,118 @@
+import os
+import re
+import json
+import fnmatch
+import logging
+from typing import NamedTuple
+
+
+SAVE_LOCATIONS_FILE_NAME = "save_locations.json"
+DEFAULT_CONFIDENCE = 0.9
+
+ENV_VAR_PATTERN = re.compile(r"%([^%]+)%")
+
+
+class SaveLocation(NamedTuple):
+    game: str
+    path: str
+    confidence: float
+
+
+def load_save_locations(*paths):
+    # Later files override games of the same name, so a copy in app_data can
+    # add to or correct the bundled database without replacing it
+    games: dict = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for game in json.load(f)["games"]:
+                    games[game["name"]] = game
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.error(f"Loading save locations from '{path}' failed: {e}")
+    return list(games.values())
+
+
+def expand_template(template, environ):
+    # %VAR% lookups are case-insensitive like on Windows; None if a variable
+    # is not set (the game can't be installed for this user then)
+    missing = False
+
+    def replace(match):
+        nonlocal missing
+        value = environ.get(match.group(1).upper())
+        if value is None:
+            missing = True
+            return ""
+        return value
+
+    expanded = ENV_VAR_PATTERN.sub(replace, template)
+    if missing:
+        return None
+    parts = re.split(r"[\\/]+", expanded)
+    # The first part is the drive ("C:") or empty for a path starting at the root
+    return os.sep.join(part for index, part in enumerate(parts) if part or index == 0)
+
+
+class SaveLocationResolver:
+    # Turns the database's path templates into existing folders with stat
+    # calls only; "*" segments list the parent folder once per resolve
+    def __init__(self, games):
+        self.patterns = [
+            (game["name"], template, game.get("confidence", DEFAULT_CONFIDENCE))
+            for game in games
+            for template in game.get("paths", [])
+        ]
+
+    def resolve(self, environ=None):
+        if environ is None:
+            environ = os.environ
+        environ = {key.upper(): value for key, value in environ.items()}
+        listings: dict = {}
+        locations: dict = {}
+        for game, template, confidence in self.patterns:
+            path = expand_template(template, environ)
+            if path is None:
+                continue
+            for folder in self._expand_wildcards(path, listings):
+                if os.path.isdir(folder) and (
+                    folder not in locations or locations[folder].confidence < confidence
+                ):
+                    locations[folder] = SaveLocation(game, folder, confidence)
+        return list(locations.values())
+
+    def _expand_wildcards(self, path, listings):
+        if "*" not in path and "?" not in path:
+            return [path]
+        parts = path.split(os.sep)
+        # Keep the drive or root ("C:" / "") attached to the first folder
+        candidates = [parts[0] + os.sep]
+        for part in parts[1:]:
+            if "*" not in part and "?" not in part:
+                candidates = [os.path.join(folder, part) for folder in candidates]
+                continue
+            matched = []
+            for folder in candidates:
+                if folder not in listings:
+                    try:
+                        listings[folder] = os.listdir(folder)
+                    except OSError:
+                        listings[folder] = []
+                matched.extend(
+                    os.path.join(folder, name)
+                    for name in fnmatch.filter(listings[folder], part)
+                )
+            candidates = matched
+        return candidates
+
+
+def merge_save_locations(save_locations, detected):
+    # folder -> (confidence, game name or None) for the finder's result list
+    results = {folder: (confidence, None) for folder, confidence in detected.items()}
+    for location in save_locations:
+        confidence = 1.0 - (1.0 - location.confidence) * (
+            1.0 - detected.get(location.path, 0.0)
+        )
+        results[location.path] = (confidence, location.game)
+    return results
@@ -0,0 +1,103 @@
+import os
+import logging
+from typing import NamedTuple
+from savemanager.path_filter import PathFilter
+
+
+class PlannedFile(NamedTuple):
+    src_path: str
+    rel_path: str
+    size: int
+    mtime_ns: int
+
+
+class FolderPlan(NamedTuple):
+    source: str
+    dirs: tuple  # relative paths of folders to create, "." is the source itself
+    files: tuple  # PlannedFile for every file to copy
+    total_size: int
+    skipped: tuple  # (log level, message) for ignored/hidden entries
+
+
+def scan_folder(source, settings, cancel_flag=None, path_filter=None):
+    # Walks the tree once with os.scandir; DirEntry.stat() is served from the
+    # directory listing on Windows, so there is no extra syscall per file.
+    # path_filter decides what is left out, by default only the settings
+    if path_filter is None:
+        path_filter = PathFilter.from_settings(settings)
+
+    dirs: list = []
+    files: list = []
+    skipped: list = []
+    total_size = 0
+
+    stack = [(source, ".")]
+    while stack:
+        if cancel_flag is not None and cancel_flag.is_set():
+            break
+        dir_path, rel_dir_path = stack.pop()
+
+        match path_filter.prune_dir(
+            dir_path, rel_dir_path, os.path.basename(dir_path)
+        ):
+            case "ignored":
+                skipped.append(
+                    ("ignore", f"Ignored because of a setting: '{rel_dir_path}'")
+                )
+                continue
+            case "hidden":
+                skipped.append(("skip", f"Skipped (hidden folder): '{rel_dir_path}'"))
+                continue
+            case "excluded":
+                skipped.append(
+                    ("ignore", f"Ignored by exclude pattern: '{rel_dir_path}'")
+                )
+                continue
+
+        try:
+            with os.scandir(dir_path) as entries:
+                entries = list(entries)
+        except OSError as e:
+            skipped.append(("error", f"Could not read folder '{rel_dir_path}': {e}"))
+            continue
+        dirs.append(rel_dir_path)
+
+        subdirs = []
+        for entry in entries:
+            rel_path = (
+                entry.name
+                if rel_dir_path == "."
+                else os.path.join(rel_dir_path, entry.name)
+            )
+            try:
+                if entry.is_dir():
+                    # Same as os.walk: symlinked folders are not followed
+                    if not entry.is_symlink():
+                        subdirs.append((entry.path, rel_path))
+                    continue
+                match path_filter.skip_file(rel_path, entry.name):
+                    case "hidden":
+                        skipped.append(
+                            ("skip", f"Skipped (hidden file): '{entry.name}'")
+                        )
+                        continue
+                    case "excluded":
+                        skipped.append(
+                            ("ignore", f"Ignored by exclude pattern: '{rel_path}'")
+                        )
+                        continue
+                stat_result = entry.stat()
+            except FileNotFoundError:
+                logging.error("File deleted during folder scan")
+                continue
+            files.append(
+                PlannedFile(
+                    entry.path, rel_path, stat_result.st_size, stat_result.st_mtime_ns
+                )
+            )
+            total_size += stat_result.st_size
+
+        # Reversed so folders are visited in listing order
+        stack.extend(reversed(subdirs))
+
+    return FolderPlan(source, tuple(dirs), tuple(files), total_size, tuple(skipped))
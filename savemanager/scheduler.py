@@ -0,0 +1,28 @@
+import logging
+
+
+def group_folder_pairs(folder_pairs, get_volume_id):
+    # Splits (FolderPlan, dest, mode) pairs into groups that share no device
+    # (source or destination volume). Groups can be copied at the same time;
+    # the pairs of one group keep their order and are copied one after
+    # another, so a disk never serves two folder pairs at once.
+    groups: list = []  # (set of devices, list of pair indexes)
+    for index, (plan, dest, _) in enumerate(folder_pairs):
+        devices = {get_volume_id(plan.source), get_volume_id(dest)}
+        indexes = [index]
+        remaining = []
+        for group_devices, group_indexes in groups:
+            if group_devices & devices:
+                devices |= group_devices
+                indexes += group_indexes
+            else:
+                remaining.append((group_devices, group_indexes))
+        groups = remaining + [(devices, indexes)]
+
+    result = []
+    for devices, indexes in sorted(groups, key=lambda group: min(group[1])):
+        logging.debug(
+            f"Copy group on {len(devices)} device(s): folder pairs {sorted(indexes)}"
+        )
+        result.append([folder_pairs[index] for index in sorted(indexes)])
+    return result
@@ -0,0 +1,39 @@
+import os
+import ast
+import configparser
+
+
+def get_default_copy_settings():
+    # Settings used by the copy engine; SaveManager.py adds the GUI ones
+    return {
+        "copy_folder_checkbox_state": False,
+        "file_size_limit": 5,
+        "skip_existing_files": True,
+        "clear_destination_folder": False,
+        "skip_hidden_files": False,
+        "ignored_folders": [],
+        "copy_threads": 0,
+        "copy_threads_per_volume": 4,
+        "incremental_copy": False,
+        "incremental_hash": False,
+        "snapshot_keep_last": 10,
+        "snapshot_keep_hourly": 24,
+        "snapshot_keep_daily": 7,
+        "snapshot_keep_weekly": 4,
+        "delta_copy": False,
+        "delta_copy_threshold": 256,
+    }
+
+
+def load_settings_file(config_file, settings, section="Settings"):
+    # Same format as SaveManager.py writes: values are Python literals
+    if not os.path.exists(config_file):
+        return settings
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    if config.has_section(section):
+        for key in settings:
+            value = config.get(section, key, fallback=None)
+            if value is not None:
+                settings[key] = ast.literal_eval(value)
+    return settings
@@ -0,0 +1,158 @@
+import os
+import re
+import shutil
+import logging
+import threading
+from datetime import datetime
+
+
+SNAPSHOT_FORMAT = "%Y-%m-%d_%H-%M-%S"
+# A timestamp, plus "_2", "_3"... for later runs in the same second
+SNAPSHOT_NAME = re.compile(r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})(?:_(\d+))?")
+PARTIAL_SUFFIX = ".partial"
+
+
+def parse_snapshot_name(name):
+    # (datetime, run) or None
+    match = SNAPSHOT_NAME.fullmatch(name)
+    if match is None:
+        return None
+    try:
+        snapshot_time = datetime.strptime(match[1], SNAPSHOT_FORMAT)
+    except ValueError:
+        return None
+    return snapshot_time, int(match[2] or 1)
+
+
+def snapshot_sort_key(name):
+    # As text "_10" sorts before "_2", so names are ordered by (time, run)
+    return parse_snapshot_name(name) or (datetime.min, 0)
+
+
+def new_snapshot_name(exists):
+    # exists(name) tells whether a name is taken in the destination
+    base_name = datetime.now().strftime(SNAPSHOT_FORMAT)
+    name = base_name
+    run = 1
+    while exists(name):
+        run += 1
+        name = f"{base_name}_{run}"
+    return name
+
+
+def list_snapshots(dest):
+    # Completed snapshots in dest as (name, datetime), oldest first
+    snapshots = []
+    for name in os.listdir(dest):
+        parsed = parse_snapshot_name(name)
+        if parsed is not None and os.path.isdir(os.path.join(dest, name)):
+            snapshots.append((name, parsed[0]))
+    return sorted(snapshots, key=lambda snapshot: snapshot_sort_key(snapshot[0]))
+
+
+class SnapshotWriter:
+    # rsync --link-dest style: a new timestamped folder per run where files that
+    # match the previous snapshot (size and mtime) are hardlinked instead of copied
+    def __init__(self, dest):
+        self.dest = dest
+        snapshots = list_snapshots(dest)
+        self.previous = os.path.join(dest, snapshots[-1][0]) if snapshots else None
+
+        self.name = new_snapshot_name(
+            lambda name: os.path.exists(os.path.join(dest, name))
+            or os.path.exists(os.path.join(dest, name + PARTIAL_SUFFIX))
+        )
+        self.path = os.path.join(dest, self.name + PARTIAL_SUFFIX)
+        self.can_link = True
+        os.makedirs(self.path, exist_ok=True)
+
+    def link_unchanged(self, rel_path, size, mtime_ns, dest_path):
+        if self.previous is None or not self.can_link:
+            return False
+        previous_path = os.path.join(self.previous, rel_path)
+        try:
+            previous_stat = os.stat(previous_path)
+        except OSError:
+            return False
+        if previous_stat.st_size != size or previous_stat.st_mtime_ns != mtime_ns:
+            return False
+        try:
+            os.link(previous_path, dest_path)
+        except FileExistsError:
+            return True
+        except OSError as e:
+            logging.debug(f"Hardlinks not available in '{self.dest}': {e}")
+            self.can_link = False
+            return False
+        return True
+
+    def finish(self):
+        final_path = os.path.join(self.dest, self.name)
+        os.replace(self.path, final_path)
+        logging.debug(f"Snapshot completed: {final_path}")
+        return final_path
+
+    def abort(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def select_snapshots_to_keep(
+    snapshots, keep_last=0, keep_hourly=0, keep_daily=0, keep_weekly=0
+):
+    # snapshots: list of (name, datetime); the newest snapshot of each hour/day/
+    # week is kept until that rule's count is used up
+    newest_first = sorted(
+        snapshots,
+        key=lambda snapshot: (snapshot[1], snapshot_sort_key(snapshot[0])[1]),
+        reverse=True,
+    )
+    keep = {name for name, _ in newest_first[:keep_last]}
+
+    rules = [
+        (keep_hourly, lambda time: (time.year, time.month, time.day, time.hour)),
+        (keep_daily, lambda time: (time.year, time.month, time.day)),
+        (keep_weekly, lambda time: time.isocalendar()[:2]),
+    ]
+    for count, get_period in rules:
+        periods: set = set()
+        for name, snapshot_time in newest_first:
+            if len(periods) >= count:
+                break
+            period = get_period(snapshot_time)
+            if period not in periods:
+                periods.add(period)
+                keep.add(name)
+    return keep
+
+
+def prune_snapshots(dest, retention):
+    snapshots = list_snapshots(dest)
+    keep = select_snapshots_to_keep(snapshots, **retention)
+    if snapshots and not keep:
+        # Never delete every snapshot because of an empty retention policy
+        keep = {snapshots[-1][0]}
+
+    for name in os.listdir(dest):
+        # Leftovers of cancelled or crashed runs
+        if name.endswith(PARTIAL_SUFFIX) and parse_snapshot_name(
+            name[: -len(PARTIAL_SUFFIX)]
+        ):
+            shutil.rmtree(os.path.join(dest, name), ignore_errors=True)
+
+    for name, _ in snapshots:
+        if name not in keep:
+            shutil.rmtree(os.path.join(dest, name), ignore_errors=True)
+            logging.debug(f"Pruned snapshot: {os.path.join(dest, name)}")
+
+
+def start_prune_thread(dests, retention):
+    def prune_all():
+        for dest in dests:
+            try:
+                prune_snapshots(dest, retention)
+            except OSError as e:
+                logging.error(f"Pruning snapshots in '{dest}' failed: {e}")
+
+    thread = threading.Thread(target=prune_all, name="snapshot_prune")
+    thread.start()
+    return thread
@@ -0,0 +1,205 @@
+import time
+import asyncio
+import logging
+import itertools
+import threading
+import collections
+import concurrent.futures
+
+
+# Lower runs first when tasks wait for a free slot
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+DEFAULT_TASK_SLOTS = 4
+
+
+class CancelToken(threading.Event):
+    # Per task cancellation; still an Event, so code that takes a cancel_flag
+    # (CopyEngine, FileCrawler, scan_folder) checks it with is_set()
+    def cancel(self):
+        self.set()
+
+    @property
+    def cancelled(self):
+        return self.is_set()
+
+
+class Task:
+    # Handle for one submitted job. The job reports progress with
+    # task.report(event, data); the GUI reads it back with TaskRuntime.poll
+    def __init__(self, name, func, args, priority, executor):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.executor = executor
+        self.token = CancelToken()
+        self.state = "queued"  # running, done, cancelled or failed
+        self.result = None
+        self.error = None
+        self._events = collections.deque()
+        self._finished = threading.Event()
+
+    def report(self, event, data=None):
+        self._events.append((event, data))
+
+    def cancel(self):
+        self.token.cancel()
+
+    def done(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def __repr__(self):
+        return f"<Task {self.name} {self.state}>"
+
+
+class TaskRuntime:
+    # One asyncio loop on a background thread runs every job: coroutine
+    # functions on the loop itself, blocking functions in a thread pool. At
+    # most `slots` jobs run at once; waiting jobs start by priority, then
+    # submission order. Jobs submitted before start() wait for it.
+    #
+    # Jobs are called as func(task, *args) and should check task.token
+    # between steps.
+    def __init__(self, slots=DEFAULT_TASK_SLOTS):
+        self.slots = slots
+        self.loop = asyncio.new_event_loop()
+        self.thread_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=slots, thread_name_prefix="task"
+        )
+        self._thread = None
+        # Binds to the loop on first use, in the loop thread
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._tasks: list = []  # not yet returned as finished by poll()
+        self._ready = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run_loop, name="task_runtime", daemon=True
+        )
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self._dispatch())
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def submit(self, name, func, *args, priority=PRIORITY_NORMAL, executor="thread"):
+        # executor: "thread" or "async" (func is a coroutine function)
+        if self.loop.is_closed():
+            raise RuntimeError(f"Task '{name}' submitted after shutdown")
+        task = Task(name, func, args, priority, executor)
+        with self._lock:
+            self._tasks.append(task)
+        item = (priority, next(self._counter), task)
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        logging.debug(f"Task '{name}' submitted")
+        return task
+
+    def cancel(self, name):
+        # Cancels every unfinished task with this name
+        with self._lock:
+            tasks = [task for task in self._tasks if task.name == name]
+        for task in tasks:
+            task.cancel()
+
+    def running(self, name):
+        with self._lock:
+            return any(task.name == name and not task.done() for task in self._tasks)
+
+    async def _dispatch(self):
+        slots = asyncio.Semaphore(self.slots)
+        while True:
+            await slots.acquire()
+            _, _, task = await self._queue.get()
+            self.loop.create_task(self._run(task, slots))
+
+    async def _run(self, task, slots):
+        try:
+            if task.token.cancelled:
+                task.state = "cancelled"
+                return
+            task.state = "running"
+            if task.executor == "async":
+                result = await task.func(task, *task.args)
+            else:
+                result = await self.loop.run_in_executor(
+                    self.thread_executor, task.func, task, *task.args
+                )
+            task.result = result
+            task.state = "cancelled" if task.token.cancelled else "done"
+        except asyncio.CancelledError:
+            # shutdown() while the job was still running
+            task.state = "cancelled"
+            raise
+        except Exception as e:
+            logging.error(f"Task '{task.name}' failed: {e}")
+            task.error = e
+            task.state = "failed"
+        finally:
+            task._finished.set()
+            slots.release()
+
+    def poll(self):
+        # Non-blocking, for the GUI frame loop: (task, event, data) for every
+        # reported event, then (task, "finished", None) once a task is done
+        events = []
+        with self._lock:
+            tasks = list(self._tasks)
+        for task in tasks:
+            # Read the state first so no event reported before finishing is missed
+            finished = task.done()
+            while task._events:
+                events.append((task, *task._events.popleft()))
+            if finished:
+                events.append((task, "finished", None))
+                with self._lock:
+                    self._tasks.remove(task)
+        return events
+
+    def shutdown(self, timeout=2.0):
+        with self._lock:
+            tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        # Running jobs get a moment to notice their token and stop cleanly
+        deadline = time.monotonic() + timeout
+        for task in tasks:
+            if task.state == "running":
+                task.wait(max(0.0, deadline - time.monotonic()))
+        self.thread_executor.shutdown(wait=False, cancel_futures=True)
+        if self._thread is not None:
+            stopped = asyncio.run_coroutine_threadsafe(self._stop(), self.loop)
+            try:
+                stopped.result(timeout)
+            except concurrent.futures.TimeoutError:
+                logging.error("Task runtime did not stop in time")
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return
+        self.loop.close()
+
+    async def _stop(self):
+        # Cancels the dispatcher and the jobs still waiting on the thread
+        # pool; a job that finishes later is then dropped instead of being
+        # handed to a closed loop
+        tasks = [
+            pending
+            for pending in asyncio.all_tasks(self.loop)
+            if pending is not asyncio.current_task()
+        ]
+        for pending in tasks:
+            pending.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
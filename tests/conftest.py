@@ -0,0 +1,69 @@
+import re
+import threading
+import http.server
+import pytest
+
+
+class FileServer(http.server.ThreadingHTTPServer):
+    # Serves one file at any path with ETag, Range and If-Range support.
+    # fail_after cuts every response after that many body bytes.
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FileHandler)
+        self.data = b""
+        self.etag = '"1"'
+        self.fail_after = None
+        self.requests: list = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/source.7z"
+
+
+class FileHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == server.etag:
+            self.send_response(304)
+            self.send_header("ETag", server.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        data = server.data
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range", server.etag) == server.etag:
+            start, end = int(match[1]), int(match[2])
+            data = data[start : end + 1]
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{end}/{len(server.data)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("ETag", server.etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            if server.fail_after is not None and len(data) > server.fail_after:
+                self.wfile.write(data[: server.fail_after])
+                self.close_connection = True
+                return
+            self.wfile.write(data)
+        except ConnectionError:
+            pass
+
+
+@pytest.fixture
+def server():
+    server = FileServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,38 @@
+import os
+import tarfile
+import threading
+from datetime import datetime
+from savemanager import snapshots
+from savemanager.archive import ArchiveWriter
+from savemanager.progress import ProgressCounters
+from savemanager.scanner import scan_folder
+from savemanager.settings import get_default_copy_settings
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 1, 12, 0, 0)
+
+
+def test_archives_in_the_same_second_are_both_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "datetime", FrozenDatetime)
+    source = tmp_path / "saves"
+    dest = tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+
+    paths = []
+    for content in (b"first", b"second"):
+        (source / "slot1.sav").write_bytes(content)
+        plan = scan_folder(str(source), get_default_copy_settings())
+        writer = ArchiveWriter(ProgressCounters(), threading.Event())
+        paths.append(writer.write(plan, str(dest)))
+
+    assert [os.path.basename(path) for path in paths] == [
+        "saves_2026-01-01_12-00-00.tar.xz",
+        "saves_2026-01-01_12-00-00_2.tar.xz",
+    ]
+    for path, content in zip(paths, (b"first", b"second")):
+        with tarfile.open(path) as archive:
+            assert archive.extractfile("slot1.sav").read() == content
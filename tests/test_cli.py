@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+import subprocess
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_copy_output_is_one_json_object_per_line(tmp_path):
+    source = tmp_path / "source"
+    dest = tmp_path / "dest"
+    data_dir = tmp_path / "app_data"
+    for folder in range(8):
+        (source / f"folder_{folder}").mkdir(parents=True)
+        for index in range(50):
+            (source / f"folder_{folder}" / f"save_{index}.sav").write_bytes(
+                os.urandom(64)
+            )
+    dest.mkdir()
+    data_dir.mkdir()
+    (data_dir / "save_folders.json").write_text(
+        json.dumps([{"name": "game", "source": str(source), "destination": str(dest)}])
+    )
+    (data_dir / "settings.ini").write_text(
+        "[Settings]\ncopy_threads = 4\ncopy_threads_per_volume = 4\n"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-m", "savemanager", "copy", "--data-dir", str(data_dir)],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert events[-1]["event"] == "complete"
+    assert sum(event["event"] == "log" for event in events) >= 400
@@ -0,0 +1,134 @@
+import os
+import threading
+from savemanager.settings import get_default_copy_settings
+from savemanager.scanner import scan_folder
+from savemanager import copy_engine
+from savemanager.copy_engine import CopyEngine
+from savemanager.progress import ProgressCounters
+
+
+def copy(source, dest, before_copy=None, mode="copy", **settings_overrides):
+    settings = get_default_copy_settings()
+    settings.update(settings_overrides)
+    plan = scan_folder(str(source), settings)
+    if before_copy is not None:
+        before_copy()
+    logs = []
+    engine = CopyEngine(
+        settings,
+        ProgressCounters(),
+        threading.Event(),
+        log_callback=lambda level, message: logs.append((level, message)),
+    )
+    assert engine.run([(plan, str(dest), mode)], plan.total_size)
+    return logs
+
+
+def make_outdated_copy(tmp_path):
+    source = tmp_path / "source"
+    dest = tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    data = os.urandom(2 * 1024 * 1024)
+    (source / "world.sav").write_bytes(data)
+    (dest / "world.sav").write_bytes(data[:1024] + b"x" * 1024 + data[2048:])
+    return source, dest
+
+
+def test_delta_copy_runs_when_existing_files_are_skipped(tmp_path):
+    source, dest = make_outdated_copy(tmp_path)
+
+    logs = copy(
+        source,
+        dest,
+        skip_existing_files=True,
+        delta_copy=True,
+        delta_copy_threshold=1,
+    )
+
+    assert (dest / "world.sav").read_bytes() == (source / "world.sav").read_bytes()
+    assert any("Copied (delta" in message for _, message in logs)
+
+
+def test_existing_files_are_skipped_without_delta_copy(tmp_path):
+    source, dest = make_outdated_copy(tmp_path)
+    outdated = (dest / "world.sav").read_bytes()
+
+    logs = copy(source, dest, skip_existing_files=True, delta_copy=False)
+
+    assert (dest / "world.sav").read_bytes() == outdated
+    assert ("skip", "Skipped (already exists): 'world.sav'") in logs
+
+
+def stalled_kernel_copy(f_src, f_dst, buffer):
+    # Like copy_file_range on some FUSE and network mounts
+    return 0
+
+
+def test_kernel_copy_returning_zero_falls_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        copy_engine,
+        "SLICE_FUNCTIONS",
+        [stalled_kernel_copy, copy_engine.readinto_slice],
+    )
+    source = tmp_path / "source"
+    dest = tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    (source / "small.sav").write_bytes(b"save" * 100)
+    (source / "large.sav").write_bytes(os.urandom(3 * 1024 * 1024 + 5))
+
+    logs = copy(source, dest)
+
+    for name in ("small.sav", "large.sav"):
+        assert (dest / name).read_bytes() == (source / name).read_bytes()
+    assert not any(level == "error" for level, _ in logs)
+
+
+def test_file_that_shrank_during_copy_is_not_kept(tmp_path):
+    source = tmp_path / "source"
+    dest = tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    (source / "world.sav").write_bytes(b"x" * 4096)
+
+    logs = copy(
+        source,
+        dest,
+        before_copy=lambda: (source / "world.sav").write_bytes(b"x" * 100),
+        skip_existing_files=True,
+    )
+
+    assert not (dest / "world.sav").exists()
+    assert ("error", "Copy failed, 100 of 4096 bytes copied: 'world.sav'") in logs
+
+
+def test_dedup_without_hardlinks_copies_only_changed_files(tmp_path, monkeypatch):
+    def no_hardlinks(src, dst):
+        raise OSError("hardlinks not supported")
+
+    monkeypatch.setattr(os, "link", no_hardlinks)
+    copied = []
+    copy_contents = CopyEngine.copy_contents
+
+    def counting_copy_contents(self, src_path, dest_path, *args, **kwargs):
+        copied.append(os.path.basename(dest_path))
+        return copy_contents(self, src_path, dest_path, *args, **kwargs)
+
+    monkeypatch.setattr(CopyEngine, "copy_contents", counting_copy_contents)
+    source = tmp_path / "source"
+    dest = tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    (source / "slot1.sav").write_bytes(b"first")
+    (source / "slot2.sav").write_bytes(b"second")
+
+    copy(source, dest, mode="dedup")
+    assert sorted(copied) == ["slot1.sav", "slot2.sav"]
+
+    copied.clear()
+    (source / "slot2.sav").write_bytes(b"second, changed")
+    copy(source, dest, mode="dedup")
+    assert copied == ["slot2.sav"]
+    assert (dest / "slot1.sav").read_bytes() == b"first"
+    assert (dest / "slot2.sav").read_bytes() == b"second, changed"
@@ -0,0 +1,26 @@
+from savemanager.copy_log import CopyLog
+
+
+def test_appended_keeps_counting_when_full():
+    log = CopyLog(capacity=10)
+    # Drained every few records, like the GUI does once per frame
+    for index in range(25):
+        log.add("copy", f"Copied: 'file_{index}'")
+        if index % 5 == 4:
+            log.drain()
+
+    assert log.visible_count() == 10
+    assert log.appended == 25
+    assert log.visible_records(0, 1)[0].message == "Copied: 'file_15'"
+
+
+def test_missing_folder_records_follow_the_skip_filter():
+    log = CopyLog()
+    log.add("missing", "Folder pair 'game' skipped as folder 'C:\\Saves' does not exist.")
+    log.add("copy", "Copied: 'save.sav'")
+    log.drain()
+
+    log.set_level_hidden("skip", True)
+    assert [record.level for record in log.visible_records(0, 10)] == ["copy"]
+    log.set_level_hidden("skip", False)
+    assert log.visible_count() == 2
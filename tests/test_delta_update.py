@@ -0,0 +1,103 @@
+import os
+import json
+import shutil
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import create_archive
+from savemanager import delta_update
+from savemanager.delta_update import (
+    DeltaUpdate,
+    INSTALL_RECORD_NAME,
+    PARTIAL_SUFFIX,
+    save_install_record,
+)
+
+
+def read_tree(root):
+    tree = {}
+    for folder, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            if name != INSTALL_RECORD_NAME:
+                with open(path, "rb") as f:
+                    tree[os.path.relpath(path, root)] = f.read()
+    return tree
+
+
+@pytest.fixture
+def release(server, tmp_path, monkeypatch):
+    # A dist folder, a function that publishes it on the server and an
+    # installation of the first version
+    monkeypatch.setattr(create_archive, "cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(create_archive, "block_size", 256 * 1024)
+    dist = tmp_path / "dist"
+    for folder in ("lib", "docs", "app_data_defaults"):
+        (dist / folder).mkdir(parents=True)
+        for index in range(20):
+            (dist / folder / f"file_{index}.bin").write_bytes(os.urandom(4096))
+    (dist / "SaveManager.exe").write_bytes(os.urandom(300 * 1024))
+
+    def publish():
+        archive_path = tmp_path / "source.7z"
+        manifest_path = tmp_path / "manifest.json"
+        create_archive.create_archive(str(archive_path), str(dist), str(manifest_path))
+        server.data = archive_path.read_bytes()
+        return json.loads(manifest_path.read_text())
+
+    install = tmp_path / "install"
+    shutil.copytree(dist, install)
+    save_install_record(str(install), publish())
+    return dist, install, publish
+
+
+def change_release(dist):
+    (dist / "lib" / "file_3.bin").write_bytes(os.urandom(5000))
+    (dist / "docs" / "file_7.bin").unlink()
+    (dist / "docs" / "new_file.txt").write_text("new")
+
+
+def test_delta_update_fetches_only_changed_blocks(server, release):
+    dist, install, publish = release
+    change_release(dist)
+    manifest = publish()
+
+    server.requests.clear()
+    update = DeltaUpdate(manifest, server.url, str(install))
+    download_size = update.plan()
+    assert update.worthwhile()
+    update.apply()
+
+    assert read_tree(install) == read_tree(dist)
+    assert 0 < download_size < len(server.data) / 2
+    assert all("Range" in request for request in server.requests)
+
+    # Nothing left to do on the next run
+    update = DeltaUpdate(manifest, server.url, str(install))
+    assert update.plan() == 0
+    assert not update.changed and not update.removed
+
+
+def test_failed_replace_restores_old_installation(server, release, monkeypatch):
+    dist, install, publish = release
+    old_tree = read_tree(install)
+    change_release(dist)
+    (dist / "SaveManager.exe").write_bytes(os.urandom(300 * 1024))
+    manifest = publish()
+
+    # The exe is still running: it can be renamed but not replaced
+    replace = os.replace
+
+    def locked_replace(src, dst):
+        if src.endswith(PARTIAL_SUFFIX) and dst.endswith("SaveManager.exe"):
+            raise PermissionError(13, "The file is in use", dst)
+        replace(src, dst)
+
+    monkeypatch.setattr(delta_update.os, "replace", locked_replace)
+    update = DeltaUpdate(manifest, server.url, str(install))
+    update.plan()
+    with pytest.raises(PermissionError):
+        update.apply()
+
+    assert read_tree(install) == old_tree
@@ -0,0 +1,21 @@
+import pytest
+from savemanager.detectors import DetectorPipeline, get_extension
+
+
+def detect(tmp_path, names):
+    files = []
+    for name in names:
+        path = tmp_path / name
+        path.write_bytes(b"\0" * 32)
+        files.append((name, str(path), get_extension(name)))
+    return DetectorPipeline([".sav"]).detect(files)
+
+
+@pytest.mark.parametrize("name", ["Save.png", "save.wav", "quicksave.mp4"])
+def test_media_file_with_save_name_is_not_a_save(tmp_path, name):
+    assert detect(tmp_path, [name]) == {}
+
+
+@pytest.mark.parametrize("name", ["quicksave", "Save01.dat", "slot_2.bin"])
+def test_save_name_with_data_extension_is_detected(tmp_path, name):
+    assert "filename" in detect(tmp_path, [name])
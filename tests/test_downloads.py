@@ -0,0 +1,73 @@
+import os
+import json
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from savemanager import downloads
+from savemanager.downloads import ReleaseCache, SegmentedDownload, STATE_SUFFIX
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    monkeypatch.setattr(downloads, "MIN_SEGMENT_SIZE", 64 * 1024)
+    monkeypatch.setattr(downloads, "CHUNK_SIZE", 16 * 1024)
+    monkeypatch.setattr(downloads, "SEGMENT_RETRIES", 0)
+
+
+def interrupted_download(server, path):
+    server.fail_after = 100 * 1024
+    with pytest.raises(requests.RequestException):
+        SegmentedDownload(server.url, str(path), len(server.data)).run()
+    server.fail_after = None
+    assert os.path.exists(str(path) + STATE_SUFFIX)
+
+
+def test_interrupted_download_resumes(server, small_segments, tmp_path):
+    server.data = os.urandom(1024 * 1024)
+    path = tmp_path / "source.7z"
+    interrupted_download(server, path)
+
+    server.requests.clear()
+    progress = []
+    SegmentedDownload(
+        server.url, str(path), len(server.data), on_progress=progress.append
+    ).run()
+
+    assert path.read_bytes() == server.data
+    assert sum(progress) == len(server.data)
+    requested = 0
+    for request in server.requests:
+        start, end = map(int, request["Range"][len("bytes=") :].split("-"))
+        requested += end + 1 - start
+    assert requested < len(server.data)
+    assert sorted(os.listdir(tmp_path)) == ["source.7z"]
+
+
+def test_download_restarts_when_file_changed_on_server(
+    server, small_segments, tmp_path
+):
+    server.data = os.urandom(1024 * 1024)
+    path = tmp_path / "source.7z"
+    interrupted_download(server, path)
+
+    # The release asset was replaced: If-Range gets the whole new file back
+    server.data = os.urandom(1024 * 1024 + 10)
+    server.etag = '"2"'
+    progress = []
+    SegmentedDownload(server.url, str(path), on_progress=progress.append).run()
+
+    assert path.read_bytes() == server.data
+    assert sum(progress) == len(server.data)
+    assert sorted(os.listdir(tmp_path)) == ["source.7z"]
+
+
+def test_release_cache_revalidates_with_etag(server, tmp_path):
+    server.data = json.dumps({"tag_name": "v2.0"}).encode()
+    cache = tmp_path / "app_data" / "release_cache.json"
+
+    first = ReleaseCache(str(cache), server.url).fetch()
+    second = ReleaseCache(str(cache), server.url).fetch()
+
+    assert first == second == {"tag_name": "v2.0"}
+    assert server.requests[1]["If-None-Match"] == server.etag
@@ -0,0 +1,64 @@
+import os
+from savemanager.finder import FileCrawler
+from savemanager.finder_index import FinderIndex
+
+
+class CancelAfter:
+    # Stands in for the task token: reports a cancel once count folders are scanned
+    def __init__(self, count):
+        self.count = count
+        self.crawler = None
+
+    def is_set(self):
+        return self.crawler.scanned_folders() >= self.count
+
+
+def make_tree(root):
+    for folder in ("a/b", "c"):
+        os.makedirs(root / folder)
+    (root / "a" / "b" / "slot1.sav").write_bytes(b"save")
+    (root / "c" / "slot2.sav").write_bytes(b"save")
+
+
+def crawl(index, root, cancel_flag=None):
+    known = index.load_known([root])
+    crawler = FileCrawler(
+        [root], [".sav"], workers=1, known=known, cancel_flag=cancel_flag
+    )
+    if cancel_flag is not None:
+        cancel_flag.crawler = crawler
+    crawler.run()
+    index.update(crawler, known, completed=cancel_flag is None)
+    return crawler
+
+
+def test_cancelled_crawl_is_finished_by_the_next_search(tmp_path):
+    root = tmp_path / "root"
+    make_tree(root)
+    root = str(root)
+    index = FinderIndex(str(tmp_path / "index.sqlite3"))
+
+    cancelled = crawl(index, root, CancelAfter(2))
+    assert len(cancelled.visited) == 2
+    assert not index.covers([root])
+
+    expected = {os.path.join(root, "a", "b"), os.path.join(root, "c")}
+    for _ in range(2):
+        crawler = crawl(index, root)
+        assert set(crawler.matches) == expected
+    assert index.covers([root])
+    assert set(index.query([root], [".sav"])) == expected
+    index.close()
+
+
+def test_unchanged_folders_are_not_listed_again(tmp_path):
+    root = tmp_path / "root"
+    make_tree(root)
+    root = str(root)
+    index = FinderIndex(str(tmp_path / "index.sqlite3"))
+
+    assert len(crawl(index, root).changed) == 4
+    crawler = crawl(index, root)
+    assert crawler.changed == []
+    assert len(crawler.visited) == 4
+    index.close()
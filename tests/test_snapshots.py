@@ -0,0 +1,44 @@
+import os
+from datetime import datetime
+from savemanager.blob_store import BlobStore
+from savemanager.snapshots import (
+    SnapshotWriter,
+    list_snapshots,
+    select_snapshots_to_keep,
+)
+
+
+SECOND = "2026-01-01_12-00-00"
+RUNS = [SECOND] + [f"{SECOND}_{run}" for run in range(2, 12)]
+
+
+def test_runs_in_the_same_second_sort_by_run_number(tmp_path):
+    for name in reversed(RUNS):
+        (tmp_path / name).mkdir()
+
+    assert [name for name, _ in list_snapshots(tmp_path)] == RUNS
+
+
+def test_retention_keeps_the_newest_run_of_a_second():
+    snapshots = [(name, datetime(2026, 1, 1, 12)) for name in RUNS]
+
+    assert select_snapshots_to_keep(snapshots, keep_last=1) == {f"{SECOND}_11"}
+
+
+def test_writers_in_the_same_second_get_run_numbers(tmp_path):
+    paths = [SnapshotWriter(str(tmp_path)).finish() for _ in range(3)]
+
+    names = [os.path.basename(path) for path in paths]
+    assert [name for name, _ in list_snapshots(tmp_path)] == names
+    assert len(set(names)) == 3
+
+
+def test_blob_store_loads_the_newest_index(tmp_path):
+    snapshot_dir = tmp_path / ".savemanager" / "snapshots"
+    snapshot_dir.mkdir(parents=True)
+    for run, name in enumerate(RUNS):
+        (snapshot_dir / f"{name}.json").write_text(
+            f'{{"files": {{"save.sav": ["hash{run}", 1, 1]}}}}'
+        )
+
+    assert BlobStore(str(tmp_path)).previous == {"save.sav": ["hash10", 1, 1]}
@@ -0,0 +1,47 @@
+import gc
+import time
+import logging
+import threading
+import pytest
+from savemanager.tasks import TaskRuntime
+
+
+def wait_for_finish(runtime, timeout=5.0):
+    finished = []
+    deadline = time.monotonic() + timeout
+    while not finished and time.monotonic() < deadline:
+        finished = [task for task, event, _ in runtime.poll() if event == "finished"]
+        time.sleep(0.01)
+    return finished
+
+
+def test_task_submitted_before_start_runs_after_start():
+    runtime = TaskRuntime()
+    task = runtime.submit("early", lambda task: task.report("step", 1) or 42)
+    runtime.start()
+
+    assert wait_for_finish(runtime) == [task]
+    assert task.state == "done" and task.result == 42
+    runtime.shutdown()
+
+
+def test_shutdown_closes_loop_without_pending_tasks(caplog):
+    release = threading.Event()
+    runtime = TaskRuntime().start()
+    # Ignores its token, so it is still running when shutdown gives up on it
+    stuck = runtime.submit("stuck", lambda task: release.wait(5))
+    runtime.submit("done", lambda task: None)
+    while stuck.state != "running":
+        time.sleep(0.01)
+
+    with caplog.at_level(logging.ERROR, logger="asyncio"):
+        runtime.shutdown(timeout=0.2)
+        release.set()
+        time.sleep(0.1)
+        gc.collect()
+
+    assert runtime.loop.is_closed()
+    assert stuck.state == "cancelled"
+    assert not [record for record in caplog.records if record.name == "asyncio"]
+    with pytest.raises(RuntimeError):
+        runtime.submit("late", lambda task: None)